@@ -0,0 +1,86 @@
+# address_index.py
+"""
+Address Index
+Maps free-form package addresses to rows of the distance matrix.
+The normalized keys and a street-number secondary index are built once; every resolved
+address is memoized, so repeated lookups (and runtime corrections such as package 9's)
+are a single dictionary hit instead of a regex scan over every stop.
+"""
+
+import re
+from profiler import profiled
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+def normalize_address(addr):
+    norm = " ".join(addr.strip().split()).lower()
+    norm = _PUNCTUATION.sub('', norm)
+    return norm
+
+def extract_street_info(addr):
+    tokens = normalize_address(addr).split()
+    return " ".join(tokens[:3])
+
+def extract_street_number(addr):
+    """The street part of the first address line, from the house number on (e.g. '195 w oakland ave')."""
+    tokens = normalize_address(addr.split(",")[0]).split()
+    for i, token in enumerate(tokens):
+        if token[0].isdigit():
+            return " ".join(tokens[i:])
+    return ""
+
+class AddressIndex:
+    def __init__(self, address_list, size=None):
+        self.size = size  # Rows in the distance matrix; no stop can be added beyond them
+        self.addresses = []
+        self._by_key = {}  # normalized full address / first line -> index
+        self._by_street = {}  # house number + street -> index, None if ambiguous
+        self._by_prefix = {}  # first three tokens -> index, None if ambiguous
+        self._cache = {}  # raw address string -> index
+        for addr in address_list:
+            self.add(addr)
+
+    def add(self, address):
+        """Register a new stop and return its index."""
+        index = len(self.addresses)
+        if self.size is not None and index >= self.size:
+            raise ValueError(f"Address '{address}' has no row in the {self.size}-stop distance matrix.")
+        self.addresses.append(address)
+        self._by_key.setdefault(normalize_address(address), index)
+        self._by_key.setdefault(normalize_address(address.split(",")[0]), index)
+        self._add_secondary(self._by_street, extract_street_number(address), index)
+        self._add_secondary(self._by_prefix, extract_street_info(address), index)
+        return index
+
+    @staticmethod
+    def _add_secondary(table, key, index):
+        if not key:
+            return
+        if key in table and table[key] != index:
+            table[key] = None  # Shared by more than one stop, so it can't identify either.
+        else:
+            table[key] = index
+
+    def resolve(self, address):
+        """Return the matrix index for an address, matching it at most once."""
+        index = self._cache.get(address)
+        if index is None:
+            index = self._match(address)
+            self._cache[address] = index
+        return index
+
+    @profiled("address resolution")
+    def _match(self, address):
+        index = self._by_key.get(normalize_address(address))
+        if index is None:
+            index = self._by_key.get(normalize_address(address.split(",")[0]))
+        if index is None:
+            index = self._by_street.get(extract_street_number(address))
+        if index is None:
+            index = self._by_prefix.get(extract_street_info(address))
+        if index is None:
+            raise ValueError(f"Address '{address}' not found in address list.")
+        return index
+
+    def __len__(self):
+        return len(self.addresses)
@@ -0,0 +1,105 @@
+# batch_evaluator.py
+"""
+Batch Route Evaluator
+Scores many candidate orderings of the same stops at once with NumPy. A batch is an integer
+array of shape (candidates, stops) whose rows are permutations of route positions, exactly like
+the routes of a RouteContext.
+For every candidate it computes, without a Python loop per stop:
+  - cumulative miles to each stop and total miles including the drive back to the hub,
+  - arrival times (minutes after 8:00 AM, after waiting at stops reached before their package
+    is released) and deadline slack at each stop,
+  - deadline violations, the stops where the truck has to wait, and whether it gets back to the
+    depot after its shift ends.
+Scores match RouteContext.evaluate, so a batch can stand in for a loop of single evaluations.
+Only benchmark.py uses it, to compare batch scoring with that loop; the route optimizer scores
+its moves incrementally and does not depend on this module or on NumPy.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # The routing pipeline works without NumPy; only batch evaluation needs it.
+    np = None
+
+from route_optimizer import EPSILON
+
+class BatchResult:
+    def __init__(self, legs, arrivals, slack, late, early, miles, overtime):
+        self.legs = legs  # (candidates, stops) cumulative miles at each stop
+        self.arrivals = arrivals  # (candidates, stops) arrival minutes after 8:00 AM
+        self.slack = slack  # (candidates, stops) deadline minus arrival; negative is late
+        self.late = late  # (candidates, stops) True where the stop misses its deadline
+        self.early = early  # (candidates, stops) True where the truck gets there before the package is available and waits
+        self.miles = miles  # (candidates,) total miles including the return to the hub
+        self.overtime = overtime  # (candidates,) True where the truck gets back after its shift ends
+
+    @property
+    def violations(self):
+        """(candidates,) number of late stops, plus one for getting back after the shift ends."""
+        return self.late.sum(axis=1) + self.overtime
+
+    @property
+    def min_slack(self):
+        """(candidates,) tightest deadline slack along each candidate."""
+        return self.slack.min(axis=1) if self.slack.shape[1] else np.zeros(len(self.miles))
+
+    def ranking(self):
+        """Candidate rows ordered by (violations, miles), best first."""
+        return np.lexsort((self.miles, self.violations))
+
+    def best(self):
+        """Row of the best candidate, or -1 for an empty batch."""
+        return int(self.ranking()[0]) if len(self.miles) else -1
+
+    def score(self, k):
+        """(violations, miles) for row k, in the form RouteContext.evaluate returns."""
+        return int(self.violations[k]), float(self.miles[k])
+
+class BatchRouteEvaluator:
+    def __init__(self, context):
+        """Precomputes NumPy views of a RouteContext's distance matrix and stop data."""
+        if np is None:
+            raise ImportError("Batch route evaluation requires NumPy (pip install numpy).")
+        size = context.distances.size
+        self.context = context
+        self.matrix = np.frombuffer(context.distances.data, dtype=np.float64, count=size * size).reshape(size, size)
+        self.stops = np.asarray(context.stops, dtype=np.intp)
+        self.deadlines = np.asarray(context.deadlines, dtype=np.float64)
+        self.releases = np.asarray(context.releases, dtype=np.float64)
+
+    def evaluate(self, routes):
+        """Score a (candidates, stops) array of route positions; returns a BatchResult."""
+        routes = np.asarray(routes, dtype=np.intp)
+        if routes.ndim == 1:
+            routes = routes[np.newaxis, :]
+        context = self.context
+        count, length = routes.shape
+        if length == 0:
+            empty = np.zeros((count, 0))
+            blank = np.zeros((count, 0), dtype=bool)
+            back = np.full(count, self.matrix[context.start, context.hub])
+            return BatchResult(empty, empty, empty, blank, blank, back, self._overtime(context.start_time, back))
+        nodes = self.stops[routes]
+        previous = np.empty_like(nodes)
+        previous[:, 0] = context.start
+        previous[:, 1:] = nodes[:, :-1]
+        legs = np.cumsum(self.matrix[previous, nodes], axis=1)
+        driving = legs * context.minutes_per_mile
+        releases = self.releases[routes]
+        # With waiting, arrival k is max(start, release j - driving to j for j <= k) + driving to k.
+        wait_from = np.maximum.accumulate(np.maximum(releases - driving, context.start_time), axis=1)
+        arrivals = wait_from + driving
+        slack = self.deadlines[routes] - arrivals
+        late = slack < -EPSILON
+        early = np.empty_like(late)
+        early[:, 0] = context.start_time + driving[:, 0] < releases[:, 0]
+        early[:, 1:] = arrivals[:, :-1] + (driving[:, 1:] - driving[:, :-1]) < releases[:, 1:]
+        back = self.matrix[nodes[:, -1], context.hub]
+        miles = legs[:, -1] + back
+        return BatchResult(legs, arrivals, slack, late, early, miles, self._overtime(arrivals[:, -1], back))
+
+    def _overtime(self, clock, back):
+        """(candidates,) True where leaving at clock and driving `back` miles misses the shift end."""
+        shift_end = self.context.shift_end
+        if shift_end is None:
+            return np.zeros(len(back), dtype=bool)
+        return clock + back * self.context.minutes_per_mile > shift_end + EPSILON
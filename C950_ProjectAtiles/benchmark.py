@@ -0,0 +1,247 @@
+# benchmark.py
+"""
+Benchmark
+Times the hot paths on synthetic manifests shaped like 'packages.csv' and 'distances.csv',
+scaled up to tens of thousands of packages and a thousand or more stops:
+  HashTable.insert / lookup, find_address_index, manifest loading, routing one large truckload
+  with the route optimizer, batch route evaluation (when NumPy is installed), a whole day on the
+  event engine (run_simulation, as main runs it), the report functions and the CSV export of a
+  whole day of 5-minute status reports.
+Results are written as JSON. Given a baseline file from an earlier run, each timing is compared
+against it and the run exits with status 1 if any benchmark is slower by more than the threshold.
+
+Usage:
+  python benchmark.py --packages 10000 --addresses 1000 --output bench.json
+  python benchmark.py --baseline bench.json --threshold 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+import batch_evaluator
+from address_index import AddressIndex
+from driver import Driver
+from hash_table import HashTable
+from main import (find_address_index, load_address_data, load_packages_into_hash,
+                  run_simulation, show_general_report, show_package_status)
+from report_renderer import ReportRenderer, report_times
+from route_optimizer import RouteContext, RouteOptimizer
+from timeline import Timeline
+from truck import Truck
+
+STREETS = ("State St", "Main St", "900 East", "700 East", "Canyon Rd", "Parkway Blvd", "2100 S", "Oakland Ave")
+DEADLINES = ("EOD", "EOD", "EOD", "10:30 AM", "12:00 PM")
+NOTES = ("", "", "", "", "", "", "", "", "", "Delayed on flight---will not arrive to depot until 9:05 am")
+
+#  Synthetic data
+
+def synthetic_address(i):
+    return f"Stop {i} {100 + (i * 37) % 9000} S {STREETS[i % len(STREETS)]}"
+
+def generate_distances(path, addresses, seed=0):
+    """Write a lower-triangular distance table (blank upper cells) for random points in a 20 x 20 mile area."""
+    rng = random.Random(seed)
+    points = [(rng.uniform(0, 20), rng.uniform(0, 20)) for _ in range(addresses)]
+    names = [synthetic_address(i) for i in range(addresses)]
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("," + ",".join(f'"{name}"' for name in names) + "\n")
+        for i, (x1, y1) in enumerate(points):
+            cells = [f"{max(math.hypot(x1 - x2, y1 - y2), 0.1) if i != j else 0:.1f}"
+                     for j, (x2, y2) in enumerate(points[:i + 1])]
+            f.write(f'"{names[i]}",' + ",".join(cells) + "," * (addresses - i - 1) + "\n")
+
+def generate_packages(path, packages, addresses, seed=0):
+    """Write a manifest in the packages.csv column layout; stop 0 (the hub) is never a destination."""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write("Package ID,Address,City ,State,Zip,Deadline,Weight,Special Notes\n")
+        for pid in range(1, packages + 1):
+            stop = rng.randrange(1, addresses)
+            f.write(f"{pid},{synthetic_address(stop)},Salt Lake City,UT,84{100 + stop % 100},"
+                    f"{rng.choice(DEADLINES)},{rng.randint(1, 90)},{rng.choice(NOTES)}\n")
+
+#  Timing
+
+def best_of(repeat, func):
+    """Run func() repeat times and return the fastest wall time in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def build_fleet(trucks, capacity):
+    """Trucks with one driver each; departures alternate 8:00 and 9:05 so delayed packages always have a truck."""
+    truck_list = [Truck(i, departure_time=timedelta(minutes=0 if i % 2 else 65), capacity=capacity)
+                  for i in range(1, trucks + 1)]
+    for i in range(1, trucks + 1):
+        Driver(i).assign_truck(truck_list)
+    return truck_list
+
+def run_benchmarks(args, workdir):
+    distances_csv = os.path.join(workdir, "distances.csv")
+    packages_csv = os.path.join(workdir, "packages.csv")
+    sim_csv = os.path.join(workdir, "packages_sim.csv")
+    generate_distances(distances_csv, args.addresses, args.seed)
+    generate_packages(packages_csv, args.packages, args.addresses, args.seed)
+    generate_packages(sim_csv, args.sim_packages, args.addresses, args.seed + 1)
+    results = {}
+
+    def record(name, ops, seconds):
+        results[name] = {"ops": ops, "seconds": seconds, "ops_per_sec": ops / seconds if seconds else None}
+
+    record("load_distances", args.addresses, best_of(args.repeat, lambda: load_address_data(distances_csv)))
+    distances = load_address_data(distances_csv)
+
+    keys = list(range(1, args.packages + 1))
+    record("hash_insert", len(keys), best_of(args.repeat, lambda: _fill(keys)))
+    table = _fill(keys)
+    record("hash_lookup", len(keys), best_of(args.repeat, lambda: [table.lookup(k) for k in keys]))
+
+    queries = [synthetic_address(i % args.addresses) + ", Salt Lake City, UT 84101" for i in range(args.packages)]
+    record("find_address_index_cold", len(queries), best_of(args.repeat, lambda: _cold_lookups(distances, queries)))
+    record("find_address_index_warm", len(queries), best_of(
+        args.repeat, lambda: [find_address_index(q, distances) for q in queries]))
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        record("load_packages_into_hash", args.packages, best_of(
+            args.repeat, lambda: load_packages_into_hash(packages_csv, HashTable(), distances)))
+
+    # One truck with many stops.
+    route_hash = HashTable()
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_packages_into_hash(sim_csv, route_hash, distances)
+    route_packages = sorted(route_hash.values(), key=lambda p: p.package_id)[:args.route_stops]
+
+    def route_once():
+        truck = Truck(1, departure_time=timedelta(minutes=65), capacity=len(route_packages))
+        for pkg in route_packages:
+            truck.load_package(pkg)
+        RouteOptimizer().optimize(truck, distances)
+    record("route_optimizer", len(route_packages), best_of(args.repeat, route_once))
+
+    # Many random orderings of one truckload, scored in one batch.
+    if batch_evaluator.np is not None:
+        np = batch_evaluator.np
+        load = route_packages[:16]
+        context = RouteContext(Truck(1, departure_time=timedelta(0)), load, distances)
+        evaluator = batch_evaluator.BatchRouteEvaluator(context)
+        rng = np.random.default_rng(args.seed)
+        candidates = rng.random((args.candidates, len(load))).argsort(axis=1)
+        record("batch_route_evaluation", args.candidates, best_of(args.repeat, lambda: evaluator.evaluate(candidates)))
+
+    # Whole fleet on the event engine: plan loads, route every trip and simulate the day.
+    trucks = math.ceil(args.sim_packages / args.capacity)
+
+    def simulate_once():
+        sim_hash = HashTable()
+        with contextlib.redirect_stdout(io.StringIO()):
+            load_packages_into_hash(sim_csv, sim_hash, distances)
+            truck_list = build_fleet(trucks, args.capacity)
+            engine = run_simulation(sim_hash, truck_list, distances)
+        return sim_hash, truck_list, engine
+    record("run_simulation", args.sim_packages, best_of(args.repeat, simulate_once))
+
+    sim_hash, truck_list, engine = simulate_once()
+    timeline = Timeline.from_simulation(sim_hash.values(), truck_list, engine.corrections, engine.cancellations)
+    report_time = timedelta(hours=2)
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink):
+        record("show_general_report", args.sim_packages, best_of(
+            args.repeat, lambda: show_general_report(sim_hash, timeline, report_time)))
+        pids = [pkg.package_id for pkg in sim_hash.values()]
+        record("show_package_status", len(pids), best_of(
+            args.repeat, lambda: [show_package_status(sim_hash, pid, timeline, report_time) for pid in pids]))
+    renderer = ReportRenderer(sim_hash, timeline)
+    day = report_times(timedelta(0), timedelta(hours=9))
+    status_csv = os.path.join(workdir, "status.csv")
+    record("export_status_csv", len(day) * args.sim_packages, best_of(
+        args.repeat, lambda: renderer.export_csv(status_csv, day)))
+    return results
+
+def _fill(keys):
+    table = HashTable()
+    for k in keys:
+        table.insert(k, k)
+    return table
+
+def _cold_lookups(distances, queries):
+    """Resolve every query against a freshly built address index (no memoized answers)."""
+    index = AddressIndex(distances.addresses)
+    for q in queries:
+        index.resolve(q)
+
+def compare(results, baseline, threshold):
+    """Annotate results with the ratio to the baseline; returns the names that regressed."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("seconds"):
+            continue
+        ratio = result["seconds"] / base["seconds"]
+        result["baseline_seconds"] = base["seconds"]
+        result["ratio"] = ratio
+        result["regressed"] = ratio > 1.0 + threshold
+        if result["regressed"]:
+            regressions.append(name)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the WGUPS routing hot paths.")
+    parser.add_argument("--packages", type=int, default=10000, help="packages for hash table, lookup and load benchmarks")
+    parser.add_argument("--addresses", type=int, default=1000, help="stops in the synthetic distance table")
+    parser.add_argument("--sim-packages", type=int, default=2000, help="packages for the fleet simulation")
+    parser.add_argument("--capacity", type=int, default=100, help="truck capacity for the fleet simulation")
+    parser.add_argument("--route-stops", type=int, default=200, help="stops on the single-truck routing benchmark")
+    parser.add_argument("--candidates", type=int, default=100000, help="routes per batch for the batch evaluator")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per benchmark; the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before flagging, e.g. 0.2 = 20%%")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as workdir:
+        results = run_benchmarks(args, workdir)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "packages": args.packages,
+            "addresses": args.addresses,
+            "sim_packages": args.sim_packages,
+            "capacity": args.capacity,
+            "route_stops": args.route_stops,
+            "candidates": args.candidates,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+        "regressions": [],
+    }
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            report["regressions"] = compare(results, json.load(f), args.threshold)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    for name in report["regressions"]:
+        print(f"REGRESSION: {name} is {results[name]['ratio']:.2f}x its baseline time", file=sys.stderr)
+    return 1 if report["regressions"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
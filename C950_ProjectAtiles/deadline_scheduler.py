@@ -0,0 +1,234 @@
+# deadline_scheduler.py
+"""
+Deadline Scheduler
+Finds an order of a truck's stops that meets every deadline when the route heuristics leave some
+late. Each stop is a time window in minutes after 8:00 AM, both ends precomputed by RouteContext:
+it opens when the package is released (flight arrival or address correction; a truck that gets
+there early waits) and closes at the package's deadline.
+  1. Quick checks prove many infeasible loads infeasible outright: a stop that cannot be reached
+     by its deadline even on the quickest way there, or two stops neither of which can follow the
+     other in time. The distance table does not obey the triangle inequality (a detour through
+     another stop can be shorter), so these bounds use shortest paths through the load's stops.
+  2. Cheapest insertion, most urgent stop first, keeps every stop's slack (the latest arrival that
+     leaves all later stops on time), so each candidate position is checked in constant time.
+  3. If insertion gets stuck, a depth-first branch and bound over the orders finds an on-time
+     order if there is one or proves there is none, within a node and time budget. It prunes
+     stops that can no longer be reached in time (again by shortest paths) and dominated
+     (visited stops, position) states.
+The ScheduleResult says which step decided and, for a load that cannot be on time, why.
+"""
+
+import time
+from datetime import timedelta
+from profiler import record_step
+from user_interface import convert_delta_to_time_str
+
+EPSILON = 1e-9  # Same tolerance as the route optimizer
+
+def _clock(minutes):
+    return convert_delta_to_time_str(timedelta(minutes=minutes))
+
+class ScheduleResult:
+    def __init__(self, route, method, reasons=(), nodes=0):
+        self.route = route  # On-time order of route positions, or None
+        self.method = method  # "insertion", "branch-and-bound", "infeasible" or "search-limit"
+        self.reasons = list(reasons)  # Why no on-time order was found
+        self.nodes = nodes  # Branch-and-bound nodes explored
+
+    @property
+    def feasible(self):
+        return self.route is not None
+
+class DeadlineScheduler:
+    name = "deadline-scheduler"
+
+    def __init__(self, node_limit=50000, time_limit=0.25, max_exact_stops=64):
+        self.node_limit = node_limit
+        self.time_limit = time_limit  # Seconds for the branch and bound
+        self.max_exact_stops = max_exact_stops  # Larger loads get only the release check and insertion
+
+    def schedule(self, context):
+        """Return a ScheduleResult for all stops of a RouteContext."""
+        n = len(context.stops)
+        mpm = context.minutes_per_mile
+        # Driving minutes between stops; index n is the route's start.
+        nodes = context.stops + [context.start]
+        travel = [[context.dist(a, b) * mpm for b in nodes] for a in nodes]
+        exact = n <= self.max_exact_stops
+        quickest = _shortest_paths(travel) if exact else None
+        reasons = self._screen(context, quickest)
+        if reasons:
+            return ScheduleResult(None, "infeasible", reasons)
+        route = self._insert(context, travel)
+        if route is not None:
+            return ScheduleResult(route, "insertion")
+        if not exact:
+            return ScheduleResult(None, "search-limit", [
+                f"No on-time order found by insertion, and {n} stops are too many for the exact search "
+                f"(limit {self.max_exact_stops})."])
+        return self._branch_and_bound(context, quickest)
+
+    def _label(self, context, pos):
+        return f"Package {context.packages[pos].package_id}"
+
+    #  1. Screening
+
+    def _screen(self, context, quickest):
+        """Reasons the stops cannot all be on time; quickest (shortest-path minutes) enables the travel checks."""
+        n = len(context.stops)
+        start = context.start_time
+        deadlines = context.deadlines
+        releases = context.releases
+        reasons = [f"{self._label(context, pos)} is not available until {_clock(releases[pos])}, "
+                   f"after its {_clock(deadlines[pos])} deadline."
+                   for pos in range(n) if releases[pos] > deadlines[pos] + EPSILON]
+        if reasons or quickest is None:
+            return reasons
+        travel = quickest
+        earliest = [max(start + travel[n][pos], releases[pos]) for pos in range(n)]
+        for pos in range(n):
+            if earliest[pos] > deadlines[pos] + EPSILON:
+                reasons.append(f"{self._label(context, pos)} cannot arrive before {_clock(earliest[pos])} even on "
+                               f"the quickest way there, after its {_clock(deadlines[pos])} deadline.")
+        if reasons:
+            return reasons
+        # Only stops whose deadline comes before the latest possible arrival anywhere can conflict.
+        horizon = max(earliest) + max(max(row) for row in travel) if n else start
+        tight = sorted((pos for pos in range(n) if deadlines[pos] < horizon), key=deadlines.__getitem__)
+        for k, a in enumerate(tight):
+            for b in tight[k + 1:]:
+                if deadlines[b] < earliest[a] + travel[a][b] - EPSILON and deadlines[a] < earliest[b] + travel[b][a] - EPSILON:
+                    reasons.append(f"{self._label(context, a)} (deadline {_clock(deadlines[a])}) and "
+                                   f"{self._label(context, b)} (deadline {_clock(deadlines[b])}) cannot both be on "
+                                   f"time: whichever is delivered first, the other is late.")
+        return reasons
+
+    #  2. Insertion with slack
+
+    def _insert(self, context, travel):
+        n = len(context.stops)
+        deadlines = context.deadlines
+        releases = context.releases
+        start = n  # Index of the start in travel
+        hub = context.hub
+        route = []
+        arrivals = []  # Arrival (after any wait) at each route stop
+        latest = []  # Latest arrival at each route stop that keeps it and every later stop on time
+        for u in sorted(range(n), key=lambda pos: (deadlines[pos], releases[pos])):
+            best = None
+            best_cost = None
+            for k in range(len(route) + 1):
+                p = route[k - 1] if k else start
+                clock = arrivals[k - 1] if k else context.start_time
+                arrive_u = max(clock + travel[p][u], releases[u])
+                if arrive_u > deadlines[u] + EPSILON:
+                    continue
+                p_node = context.stops[p] if k else context.start
+                if k < len(route):
+                    q = route[k]
+                    if max(arrive_u + travel[u][q], releases[q]) > latest[k] + EPSILON:
+                        continue
+                    q_node = context.stops[q]
+                else:
+                    q_node = hub
+                cost = (context.dist(p_node, context.stops[u]) + context.dist(context.stops[u], q_node)
+                        - context.dist(p_node, q_node))
+                if best_cost is None or cost < best_cost - EPSILON:
+                    best, best_cost = k, cost
+            record_step("deadline-insertion", len(route) + 1)
+            if best is None:
+                return None
+            route.insert(best, u)
+            arrivals, latest = self._windows(context, travel, route)
+        return route
+
+    def _windows(self, context, travel, route):
+        """(arrival, latest on-time arrival) at each stop of route."""
+        n = len(context.stops)
+        arrivals = []
+        clock = context.start_time
+        previous = n
+        for pos in route:
+            clock = max(clock + travel[previous][pos], context.releases[pos])
+            arrivals.append(clock)
+            previous = pos
+        latest = [0.0] * len(route)
+        bound = float('inf')
+        for k in range(len(route) - 1, -1, -1):
+            pos = route[k]
+            if k + 1 < len(route):
+                bound = latest[k + 1] - travel[pos][route[k + 1]]
+            latest[k] = min(context.deadlines[pos], bound)
+        return arrivals, latest
+
+    #  3. Branch and bound
+
+    def _branch_and_bound(self, context, quickest):
+        n = len(context.stops)
+        deadlines = context.deadlines
+        releases = context.releases
+        mpm = context.minutes_per_mile
+        nodes = context.stops + [context.start]
+        direct = [[context.dist(a, b) * mpm for b in nodes] for a in nodes]
+        stop_by = time.perf_counter() + self.time_limit
+        seen = {}  # (visited bitmask, current position) -> earliest clock reached there
+        blocked = [0] * n  # How often each stop was found out of reach
+        order = []
+        state = {"nodes": 0, "cut": False}
+
+        def search(current, clock, visited, remaining):
+            state["nodes"] += 1
+            if not remaining:
+                return True
+            if state["nodes"] > self.node_limit or time.perf_counter() > stop_by:
+                state["cut"] = True
+                return False
+            key = (visited, current)
+            if seen.get(key, float('inf')) <= clock + EPSILON:
+                return False
+            seen[key] = clock
+            bound = quickest[current]
+            row = direct[current]
+            children = []
+            for u in remaining:
+                if max(clock + bound[u], releases[u]) > deadlines[u] + EPSILON:
+                    blocked[u] += 1
+                    return False  # u can no longer be on time on any completion
+                arrive = max(clock + row[u], releases[u])
+                if arrive <= deadlines[u] + EPSILON:
+                    children.append((deadlines[u], row[u], u, arrive))
+            children.sort()
+            record_step("deadline-branch", len(children))
+            for _, _, u, arrive in children:
+                order.append(u)
+                if search(u, arrive, visited | (1 << u), [v for v in remaining if v != u]):
+                    return True
+                order.pop()
+                if state["cut"]:
+                    return False
+            return False
+
+        if search(n, context.start_time, 0, list(range(n))):
+            return ScheduleResult(order, "branch-and-bound", nodes=state["nodes"])
+        if state["cut"]:
+            reasons = [f"No on-time order of the {n} stops found within the search limit "
+                       f"({self.node_limit} nodes, {self.time_limit:g} s)."]
+            method = "search-limit"
+        else:
+            reasons = [f"No order of the {n} stops meets every deadline (all {state['nodes']} partial "
+                       f"orders checked)."]
+            method = "infeasible"
+        if any(blocked):
+            worst = max(range(n), key=blocked.__getitem__)
+            reasons.append(f"{self._label(context, worst)} (deadline {_clock(deadlines[worst])}) is the stop "
+                           f"most often left unreachable.")
+        return ScheduleResult(None, method, reasons, state["nodes"])
+
+def _shortest_paths(travel):
+    """All-pairs shortest path lengths (Floyd-Warshall) over a square matrix given as lists."""
+    closure = [list(row) for row in travel]
+    for k, through in enumerate(closure):
+        for i, row in enumerate(closure):
+            via = row[k]
+            closure[i] = [a if a <= via + b else via + b for a, b in zip(row, through)]
+    return closure
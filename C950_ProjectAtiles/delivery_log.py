@@ -0,0 +1,70 @@
+# delivery_log.py
+"""
+Delivery Log
+A columnar, array-backed log of a truck's events. Each event stores its time (seconds after
+8:00 AM), location, cumulative mileage and the package delivered there (0 for none). Instead of
+copying the list of undelivered packages at every stop, the log keeps only the deltas -- packages
+loaded since the previous event and the package delivered at this one -- and rebuilds the
+undelivered list on demand, so memory grows linearly with the number of stops. Iterating over
+the log replays the deltas once instead of rebuilding every row from the start.
+"""
+
+from array import array
+from datetime import timedelta
+
+class DeliveryLog:
+    def __init__(self):
+        self.times = array('d')
+        self.mileage = array('d')
+        self.delivered = array('i')
+        self.locations = []  # References to the address strings, not copies
+        self.loaded = array('i')  # Package IDs loaded, in event order
+        self.loaded_until = array('I')  # loaded[:loaded_until[i]] were on board by event i
+
+    def record(self, time, location, mileage, delivered_id=0, loaded_ids=()):
+        self.loaded.extend(loaded_ids)
+        self.times.append(time.total_seconds())
+        self.mileage.append(mileage)
+        self.delivered.append(delivered_id)
+        self.locations.append(location)
+        self.loaded_until.append(len(self.loaded))
+
+    def undelivered_at(self, i):
+        """Package IDs still on board right after event i."""
+        if i < 0:
+            i += len(self.times)
+        done = set(self.delivered[:i + 1])
+        return [pid for pid in self.loaded[:self.loaded_until[i]] if pid not in done]
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, i):
+        """A snapshot dict in the shape the original list-of-dicts log used."""
+        if i < 0:
+            i += len(self.times)
+        if not 0 <= i < len(self.times):
+            raise IndexError("delivery log index out of range")
+        return self._row(i, self.undelivered_at(i))
+
+    def _row(self, i, undelivered):
+        return {
+            "time": timedelta(seconds=self.times[i]),
+            "location": self.locations[i],
+            "mileage": self.mileage[i],
+            "undelivered": undelivered,
+        }
+
+    def __iter__(self):
+        on_board = {}  # Package IDs in load order (a dict keeps insertion order)
+        done = set()
+        start = 0
+        for i in range(len(self.times)):
+            for pid in self.loaded[start:self.loaded_until[i]]:
+                if pid not in done:
+                    on_board[pid] = None
+            start = self.loaded_until[i]
+            pid = self.delivered[i]
+            done.add(pid)
+            on_board.pop(pid, None)
+            yield self._row(i, list(on_board))
@@ -0,0 +1,61 @@
+# distance_matrix.py
+"""
+Distance Matrix
+Parses 'distances.csv' once into a dense, symmetric matrix stored in a flat array of doubles.
+The file may be a full table or only the lower triangle; missing cells are mirrored from
+the other half. Row/column 0 is the hub. Lookups are integer-indexed, so the routing loop
+never touches address strings.
+"""
+
+import csv
+from array import array
+from address_index import AddressIndex
+
+class DistanceMatrix:
+    def __init__(self, addresses, data):
+        self.addresses = addresses  # Row labels, index i <-> addresses[i]
+        self.size = len(addresses)
+        self.data = data  # array('d') of size * size, row-major
+        self.address_index = AddressIndex(addresses, self.size)
+        self.coordinates = None  # Planar embedding of the stops, see spatial_index.coordinates_of
+        self.spatial_grid = None  # Grid over the coordinates, see spatial_index.grid_of
+
+    @classmethod
+    def from_csv(cls, filename):
+        with open(filename, 'r', encoding='utf-8-sig') as csvfile:
+            rows = [row for row in csv.reader(csvfile, delimiter=',') if row]
+        # The first row is a header (blank corner cell + address names); each data row is
+        # a label followed by the distances to every column.
+        body = rows[1:] if rows and not rows[0][0].strip() else rows
+        addresses = [row[0].strip() for row in body]
+        n = len(addresses)
+        data = array('d', [0.0]) * (n * n)
+        filled = bytearray(n * n)
+        for i, row in enumerate(body):
+            for j, cell in enumerate(row[1:n + 1]):
+                cell = cell.strip()
+                if not cell:
+                    continue
+                value = float(cell)
+                data[i * n + j] = value
+                data[j * n + i] = value
+                filled[i * n + j] = filled[j * n + i] = 1
+        for i in range(n):
+            for j in range(n):
+                if i != j and not filled[i * n + j]:
+                    raise ValueError(f"Missing distance between '{addresses[i]}' and '{addresses[j]}'.")
+        return cls(addresses, data)
+
+    def index_of(self, address):
+        return self.address_index.resolve(address)
+
+    def between(self, i, j):
+        """Distance in miles between matrix indices i and j."""
+        return self.data[i * self.size + j]
+
+    def row(self, i):
+        """Read-only view of all distances from index i."""
+        return memoryview(self.data)[i * self.size:(i + 1) * self.size]
+
+    def __len__(self):
+        return self.size
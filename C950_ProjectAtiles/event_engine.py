@@ -0,0 +1,410 @@
+# event_engine.py
+"""
+Event Engine
+A discrete-event simulation of the whole fleet on one global clock. Every truck leg, hub
+return, flight arrival and address correction is an event in a priority queue, so the cost
+grows with the number of events (O(E log E)), not with trucks x packages².
+  • Only trucks with a driver are loaded at the start; the rest of the manifest waits at the hub.
+  • When a truck returns, its driver reloads it -- or switches to an idle truck at the same depot
+    that suits the waiting packages better (e.g. packages pinned to that truck) -- and leaves again.
+    Trucks only leave during their shift, and each one starts and ends its trips at its own depot;
+    the waiting packages can be loaded at any depot.
+  • Flight arrivals and shift starts release delayed packages and wake any driver idling at a depot.
+  • Address corrections take effect at their time for packages not yet delivered.
+run_until(T) advances lazily: only events up to T are processed, so queries at T are cheap.
+
+Mid-day changes (correct_address, cancel_package, break_down) are applied incrementally: only
+the affected truck's remaining stops are re-planned, from the stop it is driving to, with a
+small time-boxed pipeline. Deliveries already made and the leg being driven are left alone.
+"""
+
+import heapq
+import time
+from datetime import timedelta
+from load_planner import constraints_of, plan_truck_loads
+from route_optimizer import RouteOptimizer, make_optimizer
+
+# Event kinds. At equal times, releases, corrections and recoveries happen before trucks move.
+FLIGHT, CORRECTION, RECOVER, RESUME, ARRIVE, RETURN, DEPART = range(7)
+
+class Replan:
+    """The new order of one truck's remaining stops after a mid-day change."""
+    def __init__(self, truck_id, at, reason, packages, report, seconds):
+        self.truck_id = truck_id
+        self.at = at  # When the change was applied
+        self.reason = reason
+        self.packages = packages  # Remaining packages in delivery order
+        self.report = report  # RouteOptimizer report for the remaining stops
+        self.seconds = seconds  # Wall time spent re-planning
+
+    def __str__(self):
+        ids = ", ".join(str(pkg.package_id) for pkg in self.packages)
+        return (f"Truck {self.truck_id} re-planned after {self.reason}: [{ids}], "
+                f"{self.report['after_miles']:.2f} miles left, {self.seconds * 1000:.1f} ms")
+
+class EventEngine:
+    def __init__(self, distances, optimizer=None, replanner=None):
+        self.distances = distances
+        self.optimizer = optimizer if optimizer is not None else RouteOptimizer()
+        self.replanner = replanner if replanner is not None else make_optimizer("replan")
+        self.clock = timedelta(0)
+        self.events_processed = 0
+        self.packages = {}  # Package ID -> Package for every package the engine knows about
+        self.trucks = []
+        self.pool = []  # Packages waiting at the hub for a truck
+        self.parked = []  # Trucks at the hub without a driver
+        self.ready = []  # Trucks at the hub whose driver is waiting for packages
+        self.idle_drivers = []  # (driver, depot index) for drivers at a depot without a truck
+        self.broken = set()  # IDs of trucks taken out of service
+        self.cancelled = []  # Packages cancelled before delivery
+        self.cancellations = []  # (package ID, time) for each cancellation, for the Timeline
+        self.corrections = []  # (package ID, time, new address) for each address change applied, for the Timeline
+        self.replans = []  # Replan for every incremental change, in order
+        self._legs = {}  # Truck ID -> the leg it is driving (or waiting on); stale events are ignored
+        self._queue = []
+        self._seq = 0
+
+    def schedule(self, at, kind, *payload):
+        self._seq += 1
+        heapq.heappush(self._queue, (at, kind, self._seq, payload))
+
+    #  Setup
+
+    def setup(self, packages, truck_list, corrections=()):
+        """
+        Loads every truck that has a driver with a planned share of the packages and schedules
+        its departure; the remaining packages wait in the hub pool. corrections is a list of
+        (package_id, time, new_address).
+        """
+        self.trucks = list(truck_list)
+        for pkg in packages:
+            self.packages[pkg.package_id] = pkg
+        driven = [truck for truck in self.trucks if truck.driver is not None]
+        self.pool = plan_truck_loads(list(packages), driven, self.distances, strict=False, corrections=corrections)
+        self.parked = [truck for truck in self.trucks if truck.driver is None]
+        for truck in driven:
+            self.schedule(truck.departure_time, DEPART, truck)
+        releases = {constraints_of(pkg).available_time for pkg in packages} - {None}
+        for release in sorted(releases | {truck.shift_start for truck in self.parked}):
+            self.schedule(release, FLIGHT)
+        for pid, when, address in corrections:
+            self.schedule(when, CORRECTION, pid, address)
+
+    def add_package(self, pkg, at=None):
+        """Adds a late-arriving package to the hub pool; it can be loaded from time `at` on."""
+        at = max(at if at is not None else self.clock, self.clock)
+        self.packages[pkg.package_id] = pkg
+        constraints = constraints_of(pkg)
+        if constraints.available_time is None or constraints.available_time < at:
+            constraints.available_time = at
+        self.pool.append(pkg)
+        self.schedule(at, FLIGHT)
+
+    #  Running
+
+    def run_until(self, at):
+        """Process every event at or before `at` and move the clock there."""
+        while self._queue and self._queue[0][0] <= at:
+            when, kind, _, payload = heapq.heappop(self._queue)
+            self.clock = when
+            self.events_processed += 1
+            self._handlers[kind](self, *payload)
+        if at > self.clock:
+            self.clock = at
+
+    def run(self):
+        """Process events until the queue is empty."""
+        while self._queue:
+            self.run_until(self._queue[0][0])
+
+    def undelivered(self):
+        return [pkg for pkg in self.packages.values() if pkg.delivery_time is None]
+
+    #  Mid-day changes
+
+    def correct_address(self, pid, address, at=None):
+        """
+        Moves an undelivered package to a new address at time `at`. If it is on a truck that is
+        out on its route, that truck's remaining stops are re-planned; returns the Replan or None.
+        """
+        self.run_until(self._at(at))
+        pkg = self._undelivered(pid)
+        pkg.address_index = self.distances.index_of(address)
+        pkg.address = address
+        self.corrections.append((pid, self.clock, address))
+        truck = self._carrier(pkg)
+        return self._replan(truck, f"new address for package {pid}") if truck is not None else None
+
+    def cancel_package(self, pid, at=None):
+        """
+        Withdraws an undelivered package at time `at`. If its truck is out on its route the rest
+        of the route is re-planned without it; returns the Replan or None.
+        """
+        self.run_until(self._at(at))
+        pkg = self._undelivered(pid)
+        del self.packages[pid]
+        pkg.status = "Cancelled"
+        self.cancelled.append(pkg)
+        self.cancellations.append((pid, self.clock))
+        if pkg in self.pool:
+            self.pool.remove(pkg)
+            return None
+        truck = self._carrier(pkg)
+        if truck is None:
+            return None
+        truck.packages.remove(pkg)
+        return self._replan(truck, f"cancellation of package {pid}")
+
+    def break_down(self, truck_id, at=None):
+        """
+        Takes a truck out of service at time `at`. It stays at its last stop; its undelivered
+        packages are carried back to the hub and rejoin the pool, and its driver takes a parked
+        truck at that depot, now or as soon as one is parked there. The other trucks' routes
+        are not touched.
+        """
+        self.run_until(self._at(at))
+        truck = self._truck(truck_id)
+        if truck_id in self.broken:
+            raise ValueError(f"Truck {truck_id} is already out of service.")
+        self.broken.add(truck_id)
+        self._legs.pop(truck_id, None)
+        if truck in self.parked:
+            self.parked.remove(truck)
+        if truck in self.ready:
+            self.ready.remove(truck)
+        stranded, truck.packages = truck.packages, []
+        distance = self.distances.between(truck.current_index, truck.hub_index)
+        self.schedule(self.clock + self._travel(truck, distance), RECOVER, truck, stranded)
+
+    def _at(self, at):
+        return self.clock if at is None else max(at, self.clock)
+
+    def _truck(self, truck_id):
+        for truck in self.trucks:
+            if truck.truck_id == truck_id:
+                return truck
+        raise ValueError(f"Truck {truck_id} does not exist.")
+
+    def _undelivered(self, pid):
+        pkg = self.packages.get(pid)
+        if pkg is None or pkg.delivery_time is not None:
+            raise ValueError(f"Package {pid} is not waiting to be delivered.")
+        return pkg
+
+    def _carrier(self, pkg):
+        """The truck the package is loaded on, or None if it is still at the hub."""
+        for truck in self.trucks:
+            if any(loaded is pkg for loaded in truck.packages):
+                return truck
+        return None
+
+    def _replan(self, truck, reason):
+        """
+        Re-orders a truck's remaining stops from where its current leg ends. A truck still at the
+        hub is left alone: its route is planned when it departs.
+        """
+        leg = self._legs.get(truck.truck_id)
+        if leg is None or leg[0] == RETURN:
+            return None
+        kind, arrival, destination, target, _ = leg
+        if kind == RESUME:
+            # Waiting for a release: re-plan from here and now, and drop the pending wake-up.
+            start, start_time = truck.current_index, self.clock
+            del self._legs[truck.truck_id]
+        else:
+            start, start_time = destination, arrival
+        heading = target if target in truck.packages and target.address_index == destination else None
+        stops = [pkg for pkg in truck.packages if pkg is not heading]
+        began = time.perf_counter()
+        route, report = self.replanner.optimize(truck, self.distances, stops, start, start_time)
+        truck.packages = route[::-1] + ([heading] if heading is not None else [])
+        truck.route_report = report
+        replan = Replan(truck.truck_id, self.clock, reason, route, report, time.perf_counter() - began)
+        self.replans.append(replan)
+        if kind == RESUME:
+            truck.current_time = self.clock
+            self._next_leg(truck)
+        return replan
+
+    #  Event handlers
+
+    def _on_depart(self, truck):
+        if truck.truck_id in self.broken:
+            return
+        truck.current_time = self.clock
+        if not truck.packages:
+            self._dispatch(truck)
+            return
+        truck.trip_starts.append(self.clock)
+        route, report = self.optimizer.optimize(truck, self.distances)
+        truck.route_report = report
+        truck.trip_reports.append(report)
+        for pkg in route:
+            pkg.status = "En Route"
+            pkg.loaded_time = self.clock
+            pkg.truck_id = truck.truck_id
+        # Remaining stops are kept in reverse route order so each leg pops from the end.
+        truck.packages = route[::-1]
+        truck.current_index = truck.hub_index
+        self._next_leg(truck)
+
+    def _next_leg(self, truck):
+        if not truck.packages:
+            distance = self.distances.between(truck.current_index, truck.hub_index)
+            self._start_leg(truck, RETURN, self.clock + self._travel(truck, distance), truck.hub_index, None, distance)
+            return
+        # Drive to the next stop in route order. If the truck would get there before the package is
+        # released (e.g. its address is not corrected yet), it waits here first, as the route planned.
+        pkg = truck.packages[-1]
+        distance = self.distances.between(truck.current_index, pkg.address_index)
+        travel = self._travel(truck, distance)
+        release = constraints_of(pkg).release_time
+        if self.clock + travel < release:
+            self._start_leg(truck, RESUME, release - travel, truck.current_index)
+            return
+        self._start_leg(truck, ARRIVE, self.clock + travel, pkg.address_index, pkg, distance)
+
+    def _start_leg(self, truck, kind, at, destination, pkg=None, distance=0.0):
+        leg = (kind, at, destination, pkg, distance)
+        self._legs[truck.truck_id] = leg
+        self.schedule(at, kind, truck, leg)
+
+    def _end_leg(self, truck, leg):
+        """True if leg is still the truck's current leg (it was not re-planned or cancelled)."""
+        if self._legs.get(truck.truck_id) is not leg:
+            return False
+        del self._legs[truck.truck_id]
+        return True
+
+    def _on_resume(self, truck, leg):
+        if not self._end_leg(truck, leg):
+            return
+        truck.current_time = self.clock
+        self._next_leg(truck)
+
+    def _on_arrive(self, truck, leg):
+        if not self._end_leg(truck, leg):
+            return
+        _, _, destination, pkg, distance = leg
+        if pkg in truck.packages and pkg.address_index == destination:
+            truck.packages.remove(pkg)
+            truck.deliver_package(pkg, distance)
+        else:
+            # The package was cancelled or re-addressed while the truck was on its way here.
+            truck.drive_to(self.distances.addresses[destination], distance)
+        truck.current_index = destination
+        self._next_leg(truck)
+
+    def _on_return(self, truck, leg):
+        if not self._end_leg(truck, leg):
+            return
+        truck.send_back_to_hub(leg[4])
+        truck.current_index = truck.hub_index
+        self._dispatch(truck)
+
+    def _on_recover(self, truck, stranded):
+        for pkg in stranded:
+            pkg.status = "At Hub"
+        self.pool.extend(stranded)
+        driver = truck.driver
+        if driver is not None:
+            # The driver waits at the depot for a spare truck, now or when one is parked there.
+            driver.remove_truck()
+            self.idle_drivers.append((driver, truck.hub_index))
+        self._on_flight()
+
+    def _on_flight(self):
+        self._assign_idle_drivers()
+        ready, self.ready = self.ready, []
+        for truck in ready:
+            self._dispatch(truck)
+
+    def _assign_idle_drivers(self):
+        """Gives each idle driver the parked truck at their depot that fits the waiting packages best."""
+        waiting, self.idle_drivers = self.idle_drivers, []
+        for driver, depot in waiting:
+            spares = [t for t in self.parked if t.hub_index == depot]
+            if not spares:
+                self.idle_drivers.append((driver, depot))
+                continue
+            spare = max(spares, key=lambda t: self._fit(t, self.pool))
+            self.parked.remove(spare)
+            driver.assign_truck([spare])
+            self._dispatch(spare)
+
+    def _on_correction(self, pid, address):
+        pkg = self.packages.get(pid)
+        if pkg is None or pkg.delivery_time is not None:
+            return
+        if not constraints_of(pkg).wrong_address:
+            return
+        pkg.address = address
+        pkg.address_index = self.distances.index_of(address)
+        self.corrections.append((pid, self.clock, address))
+        truck = self._carrier(pkg)
+        if truck is not None:
+            self._replan(truck, f"address correction for package {pid}")
+
+    _handlers = {
+        FLIGHT: _on_flight,
+        CORRECTION: _on_correction,
+        RECOVER: _on_recover,
+        RESUME: _on_resume,
+        ARRIVE: _on_arrive,
+        RETURN: _on_return,
+        DEPART: _on_depart,
+    }
+
+    #  Dispatch
+
+    def _dispatch(self, truck):
+        """
+        A driver is at a depot with `truck`: load the best truck there that is on shift for the
+        waiting packages and leave.
+        """
+        available = [pkg for pkg in self.pool
+                     if (constraints_of(pkg).available_time or timedelta(0)) <= self.clock]
+        candidates = [t for t in [truck] + self.parked if t.hub_index == truck.hub_index and t.on_shift(self.clock)]
+        if not available or not candidates:
+            if self.pool:
+                self.ready.append(truck)  # Woken by the next flight arrival or shift start
+            return
+        target = max(candidates, key=lambda t: self._fit(t, available))
+        if target is not truck:
+            driver = truck.driver
+            driver.remove_truck()
+            self.parked.remove(target)
+            driver.assign_truck([target])
+            self.parked.append(truck)
+            if self.idle_drivers:
+                self._assign_idle_drivers()
+        target.current_time = self.clock
+        if not target.trip_starts and not target.delivery_log.times:
+            target.departure_time = self.clock
+        loaded = set(map(id, available))
+        leftovers = plan_truck_loads(available, [target], self.distances, strict=False)
+        left = set(map(id, leftovers))
+        self.pool = [pkg for pkg in self.pool if id(pkg) not in loaded or id(pkg) in left]
+        if target.packages:
+            self.schedule(self.clock, DEPART, target)
+        else:
+            self.ready.append(target)
+
+    @staticmethod
+    def _fit(truck, packages):
+        """How many of the packages this truck may carry, capped at its capacity (lightest first by weight)."""
+        allowed = [pkg for pkg in packages if constraints_of(pkg).truck_only in (None, truck.truck_id)]
+        if truck.max_weight is None:
+            return min(len(allowed), truck.capacity)
+        count = 0
+        weight = 0.0
+        for pkg in sorted(allowed, key=lambda p: p.weight_kg):
+            if not truck.can_carry((pkg,), count, weight):
+                break
+            count += 1
+            weight += pkg.weight_kg
+        return count
+
+    @staticmethod
+    def _travel(truck, distance):
+        return timedelta(hours=distance / truck.speed_mph)
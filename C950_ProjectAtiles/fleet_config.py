@@ -0,0 +1,125 @@
+# fleet_config.py
+"""
+Fleet Configuration
+Defines the fleet in a JSON file instead of three identical trucks at one hub:
+  {
+    "depots": [{"name": "Hub", "address": "4001 South 700 East"},
+               {"name": "North Depot", "address": "Council Hall 300 State St"}],
+    "drivers": 3,
+    "trucks": [
+      {"id": 1, "depot": "Hub", "capacity": 16, "max_weight_kg": 400, "speed_mph": 18,
+       "shift_start": "8:00 AM", "shift_end": "5:00 PM"},
+      {"id": 4, "depot": "North Depot", "capacity": 24, "speed_mph": 25, "shift_start": "9:05 AM"}
+    ]
+  }
+Depot addresses must be stops in the distance table and are matched like package addresses.
+Every truck field except "id" is optional: the first depot, 16 packages, no weight limit,
+18 mph, and a shift from 8:00 AM with no fixed end. Without "depots" the only depot is the hub
+(row 0 of the distance table). "drivers" defaults to one per truck; drivers take trucks in
+file order. Times are 'HH:MM AM/PM' or 24-hour 'HH:MM'.
+"""
+
+import json
+from driver import Driver
+from truck import Truck
+from user_interface import parse_report_time
+
+TRUCK_FIELDS = {"id", "depot", "capacity", "max_weight_kg", "speed_mph", "shift_start", "shift_end"}
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+class Depot:
+    def __init__(self, name, address=None):
+        self.name = name
+        self.address = address  # None for the hub, row 0 of the distance table
+
+class FleetConfig:
+    def __init__(self, depots, trucks, drivers=None):
+        self.depots = depots  # List of Depot; the first is the default
+        self.trucks = trucks  # One dict of TRUCK_FIELDS per truck
+        self.drivers = len(trucks) if drivers is None else drivers
+
+    @classmethod
+    def from_dict(cls, data, source="fleet config"):
+        if not isinstance(data, dict):
+            raise ValueError(f"{source}: expected a JSON object.")
+        entries = data.get("depots") or [{"name": "Hub"}]
+        if not isinstance(entries, list) or not all(isinstance(entry, dict) for entry in entries):
+            raise ValueError(f"{source}: depots must be a list of JSON objects.")
+        depots = [Depot(entry.get("name"), entry.get("address")) for entry in entries]
+        names = [depot.name for depot in depots]
+        if any(not name or not isinstance(name, str) for name in names) or len(set(names)) != len(names):
+            raise ValueError(f"{source}: every depot needs a unique name.")
+        trucks = data.get("trucks")
+        if not trucks:
+            raise ValueError(f"{source}: no trucks defined.")
+        seen = set()
+        for spec in trucks:
+            if not isinstance(spec, dict):
+                raise ValueError(f"{source}: every truck must be a JSON object.")
+            unknown = set(spec) - TRUCK_FIELDS
+            if unknown:
+                raise ValueError(f"{source}: unknown truck field(s) {', '.join(sorted(unknown))}.")
+            if not isinstance(spec.get("id"), int) or isinstance(spec["id"], bool) or spec["id"] in seen:
+                raise ValueError(f"{source}: every truck needs a unique integer id.")
+            seen.add(spec["id"])
+            if spec.get("depot", names[0]) not in names:
+                raise ValueError(f"{source}: truck {spec['id']} uses unknown depot '{spec['depot']}'.")
+            capacity = spec.get("capacity", 16)
+            if not _is_number(capacity) or capacity != int(capacity) or capacity < 1:
+                raise ValueError(f"{source}: truck {spec['id']}'s capacity must be a positive whole number, "
+                                 f"not {capacity!r}.")
+            speed = spec.get("speed_mph", 18)
+            if not _is_number(speed) or speed <= 0:
+                raise ValueError(f"{source}: truck {spec['id']}'s speed_mph must be a positive number, not {speed!r}.")
+            max_weight = spec.get("max_weight_kg")
+            if max_weight is not None and (not _is_number(max_weight) or max_weight <= 0):
+                raise ValueError(f"{source}: truck {spec['id']}'s max_weight_kg must be a positive number, "
+                                 f"not {max_weight!r}.")
+            for field in ("shift_start", "shift_end"):
+                if spec.get(field) is not None and not isinstance(spec[field], str):
+                    raise ValueError(f"{source}: truck {spec['id']}'s {field} must be a time like '8:00 AM', "
+                                     f"not {spec[field]!r}.")
+            start = parse_report_time(spec.get("shift_start", "8:00 AM"))
+            if spec.get("shift_end") is not None and parse_report_time(spec["shift_end"]) <= start:
+                raise ValueError(f"{source}: truck {spec['id']}'s shift ends before it starts.")
+        drivers = data.get("drivers")
+        if drivers is not None and (not isinstance(drivers, int) or isinstance(drivers, bool) or drivers < 1):
+            raise ValueError(f"{source}: drivers must be a positive integer.")
+        return cls(depots, trucks, drivers)
+
+    def build(self, distances):
+        """Returns (truck_list, driver_list), with each depot resolved to its distance table row."""
+        rows = {}
+        for depot in self.depots:
+            rows[depot.name] = 0 if depot.address is None else distances.address_index.resolve(depot.address)
+        truck_list = []
+        for spec in self.trucks:
+            depot = spec.get("depot", self.depots[0].name)
+            shift_end = spec.get("shift_end")
+            max_weight = spec.get("max_weight_kg")
+            truck_list.append(Truck(
+                spec["id"],
+                departure_time=parse_report_time(spec.get("shift_start", "8:00 AM")),
+                speed=spec.get("speed_mph", 18),
+                capacity=int(spec.get("capacity", 16)),
+                max_weight=None if max_weight is None else float(max_weight),
+                depot_index=rows[depot],
+                depot=depot,
+                shift_end=None if shift_end is None else parse_report_time(shift_end),
+            ))
+        driver_list = []
+        for i in range(1, self.drivers + 1):
+            d = Driver(i)
+            d.assign_truck(truck_list)
+            driver_list.append(d)
+        return truck_list, driver_list
+
+def load_fleet_config(filename):
+    with open(filename, 'r', encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{filename}: invalid JSON ({e}).")
+    return FleetConfig.from_dict(data, filename)
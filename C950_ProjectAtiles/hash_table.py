@@ -1,44 +1,149 @@
 # hash_table.py
 """
 Hash Table
-Implements a simple hash table using linear probing to store Package objects.
+Implements a resizable hash table using linear probing to store Package objects.
+  - The capacity is kept at a power of two and keys are spread with Fibonacci (multiplicative)
+    hashing, so sequential package IDs don't land in one contiguous run of slots.
+  - The table grows once live entries plus tombstones pass the load factor; when most of that
+    load is tombstones it is rebuilt at the same size instead (tombstone compaction).
+  - Slot states live in a bytearray rather than parallel lists of strings.
 """
 
+EMPTY, OCCUPIED, REMOVED = 0, 1, 2
+
+_GOLDEN = 11400714819323198485  # 2**64 / golden ratio
+_MASK64 = (1 << 64) - 1
+
 class HashTable:
-    def __init__(self, capacity=40):
+    def __init__(self, capacity=40, load_factor=0.75):
+        if not 0.1 <= load_factor < 1.0:
+            raise ValueError("load_factor must be between 0.1 and 1.0.")
+        self.load_factor = load_factor
+        self._allocate(self._size_for(capacity))
+
+    def _allocate(self, capacity):
         self.capacity = capacity
-        self.table = [None] * capacity
-        self.status = ["EMPTY"] * capacity
+        self._bits = capacity.bit_length() - 1
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+        self.status = bytearray(capacity)  # EMPTY / OCCUPIED / REMOVED per slot
+        self.count = 0  # Live entries
+        self.tombstones = 0
+        self._limit = int(capacity * self.load_factor)
+
+    def _size_for(self, entries):
+        capacity = 8
+        while capacity * self.load_factor < entries:
+            capacity *= 2
+        return capacity
 
     def _hash(self, key):
-        return key % self.capacity
+        h = key if isinstance(key, int) else hash(key)
+        return ((h * _GOLDEN) & _MASK64) >> (64 - self._bits)
 
-    def insert(self, key, value):
+    def _find(self, key):
+        """Slot holding key, or -1."""
+        mask = self.capacity - 1
         index = self._hash(key)
-        start_index = index
-        while True:
-            if self.status[index] in ("EMPTY", "REMOVED"):
-                self.table[index] = (key, value)
-                self.status[index] = "OCCUPIED"
-                return
+        status = self.status
+        for _ in range(self.capacity):
+            state = status[index]
+            if state == EMPTY:
+                return -1
+            if state == OCCUPIED and self._keys[index] == key:
+                return index
+            index = (index + 1) & mask
+        return -1
+
+    def _rehash(self, capacity):
+        keys, values, status = self._keys, self._values, self.status
+        self._allocate(capacity)
+        for i, state in enumerate(status):
+            if state == OCCUPIED:
+                self._place(keys[i], values[i])
+
+    def _place(self, key, value):
+        """Store a key known not to be present into the first free slot of its probe sequence."""
+        mask = self.capacity - 1
+        index = self._hash(key)
+        while self.status[index] == OCCUPIED:
+            index = (index + 1) & mask
+        if self.status[index] == REMOVED:
+            self.tombstones -= 1
+        self._keys[index] = key
+        self._values[index] = value
+        self.status[index] = OCCUPIED
+        self.count += 1
+
+    def insert(self, key, value):
+        index = self._find(key)
+        if index >= 0:
+            self._values[index] = value
+            return
+        if self.count + self.tombstones + 1 > self._limit:
+            if self.tombstones > self.count:
+                self.compact()
             else:
-                stored_key, _ = self.table[index]
-                if stored_key == key:
-                    self.table[index] = (key, value)
-                    return
-            index = (index + 1) % self.capacity
-            if index == start_index:
-                raise Exception("Hash table is full.")
+                self._rehash(self.capacity * 2)
+        self._place(key, value)
+
+    def insert_many(self, items):
+        """Bulk insert (key, value) pairs, growing the table once up front."""
+        items = list(items)
+        needed = self._size_for(self.count + len(items))
+        if needed > self.capacity:
+            self._rehash(needed)
+        for key, value in items:
+            self.insert(key, value)
 
     def lookup(self, key):
-        index = self._hash(key)
-        start_index = index
-        while self.status[index] != "EMPTY":
-            if self.status[index] == "OCCUPIED":
-                stored_key, stored_value = self.table[index]
-                if stored_key == key:
-                    return stored_value
-            index = (index + 1) % self.capacity
-            if index == start_index:
-                break
-        return None
+        index = self._find(key)
+        return self._values[index] if index >= 0 else None
+
+    def remove(self, key):
+        """Removes key and returns its value, or None if it was not present."""
+        index = self._find(key)
+        if index < 0:
+            return None
+        value = self._values[index]
+        self._keys[index] = None
+        self._values[index] = None
+        self.status[index] = REMOVED
+        self.count -= 1
+        self.tombstones += 1
+        return value
+
+    def compact(self):
+        """Rebuild the table without tombstones, shrinking it if it is mostly empty."""
+        self._rehash(max(self._size_for(self.count + 1), 8))
+
+    def max_probe_length(self):
+        """Longest probe sequence any live key needs; useful to check the hash spreads keys well."""
+        longest = 0
+        mask = self.capacity - 1
+        for i, state in enumerate(self.status):
+            if state == OCCUPIED:
+                longest = max(longest, ((i - self._hash(self._keys[i])) & mask) + 1)
+        return longest
+
+    def __len__(self):
+        return self.count
+
+    def __contains__(self, key):
+        return self._find(key) >= 0
+
+    def items(self):
+        for i, state in enumerate(self.status):
+            if state == OCCUPIED:
+                yield self._keys[i], self._values[i]
+
+    def keys(self):
+        for key, _ in self.items():
+            yield key
+
+    def values(self):
+        for _, value in self.items():
+            yield value
+
+    def __iter__(self):
+        return self.keys()
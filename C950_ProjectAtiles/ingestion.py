@@ -0,0 +1,187 @@
+# ingestion.py
+"""
+Manifest Ingestion
+Streams package manifests into the hash table in chunks instead of loading a whole file at once.
+  - Columns are located by header name, not position, so reordered or extra columns are fine.
+  - Every row is validated (ID, address, deadline, weight, known stop); bad rows are quarantined
+    with their line number and reason instead of aborting the load.
+  - append() ingests late-arriving pieces (with or without a header) into a table that is
+    already in use, and hands each new package to a callback so a running simulation can pick it up.
+  - Throughput (rows/sec) is tracked for every call.
+"""
+
+import csv
+import time
+from package import Package
+from profiler import profiled
+from load_planner import parse_special_note
+from user_interface import deadline_to_timedelta
+
+# Canonical column name -> accepted header spellings (compared lowercase, without spaces).
+COLUMNS = {
+    "package_id": ("packageid", "id"),
+    "street": ("address", "street"),
+    "city": ("city",),
+    "state": ("state",),
+    "zip_code": ("zip", "zipcode", "zip_code"),
+    "deadline": ("deadline", "deliverydeadline"),
+    "weight": ("weight", "weightkilo", "weightkg", "mass"),
+    "notes": ("specialnotes", "notes"),
+}
+REQUIRED = ("package_id", "street", "city", "state", "zip_code", "deadline", "weight")
+# Column order of the original packages.csv, used when a piece arrives without a header.
+DEFAULT_LAYOUT = {"package_id": 0, "street": 1, "city": 2, "state": 3, "zip_code": 4,
+                  "deadline": 5, "weight": 6, "notes": 7}
+
+class QuarantinedRow:
+    def __init__(self, source, line_number, row, reason):
+        self.source = source
+        self.line_number = line_number
+        self.row = row
+        self.reason = reason
+
+    def __str__(self):
+        return f"{self.source}:{self.line_number}: {self.reason}"
+
+class IngestStats:
+    def __init__(self):
+        self.rows = 0
+        self.accepted = 0
+        self.quarantined = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds > 0 else 0.0
+
+    def __str__(self):
+        return (f"{self.rows} rows ({self.accepted} loaded, {self.quarantined} quarantined) "
+                f"in {self.seconds:.3f}s, {self.rows_per_sec:,.0f} rows/sec")
+
+def map_columns(header):
+    """Map canonical column names to positions in the header; raises ValueError if one is missing."""
+    layout = {}
+    for position, name in enumerate(header):
+        key = "".join(name.lower().split())
+        for column, spellings in COLUMNS.items():
+            if key in spellings and column not in layout:
+                layout[column] = position
+    missing = [column for column in REQUIRED if column not in layout]
+    if missing:
+        raise ValueError(f"Manifest header is missing column(s): {', '.join(missing)}.")
+    return layout
+
+def build_package(fields, distances):
+    """Validate one row's fields and build its Package; raises ValueError describing the problem."""
+    try:
+        pkg_id = int(fields["package_id"])
+    except ValueError:
+        raise ValueError(f"package ID '{fields['package_id']}' is not an integer")
+    if pkg_id <= 0:
+        raise ValueError(f"package ID {pkg_id} must be positive")
+    street = fields["street"]
+    if not street:
+        raise ValueError("address is empty")
+    try:
+        deadline_to_timedelta(fields["deadline"])
+    except ValueError:
+        raise ValueError(f"deadline '{fields['deadline']}' is not 'EOD' or HH:MM AM/PM")
+    try:
+        float(fields["weight"] or 0)
+    except ValueError:
+        raise ValueError(f"weight '{fields['weight']}' is not a number")
+    address = f"{street}, {fields['city']}, {fields['state']} {fields['zip_code']}"
+    p = Package(pkg_id, address, fields["city"], fields["state"], fields["zip_code"],
+                fields["deadline"], fields["weight"], fields["notes"])
+    # Resolve the street to a distance matrix index once, so routing never matches strings.
+    p.address_index = distances.index_of(street)
+    p.constraints = parse_special_note(fields["notes"])
+    # Save the listed address so reports can show it until a correction applies.
+    p.original_address = address
+    return p
+
+class ManifestIngestor:
+    def __init__(self, package_hash, distances, chunk_size=5000):
+        self.package_hash = package_hash
+        self.distances = distances
+        self.chunk_size = chunk_size
+        self.layout = None  # Column layout from the first header seen
+        self.quarantine = []  # QuarantinedRow for every rejected row
+        self.stats = IngestStats()  # Totals across every call
+
+    def iter_chunks(self, lines, source="<stream>", has_header=True):
+        """
+        Yields lists of up to chunk_size valid Packages from an iterable of CSV lines
+        (an open file, a list of strings, ...). Invalid rows are quarantined as they are met.
+        """
+        reader = csv.reader(lines, delimiter=',')
+        line_number = 0
+        layout = self.layout
+        if has_header:
+            header = next(reader, None)
+            line_number = 1
+            if header is None:
+                return
+            layout = map_columns(header)
+            if self.layout is None:
+                self.layout = layout
+        if layout is None:
+            layout = DEFAULT_LAYOUT
+        width = max(layout.values()) + 1
+        seen = set()
+        chunk = []
+        for row in reader:
+            line_number += 1
+            if not row or not any(cell.strip() for cell in row):
+                continue
+            if len(row) < width:
+                row = row + [""] * (width - len(row))
+            fields = {column: row[position].strip() for column, position in layout.items()}
+            fields.setdefault("notes", "")
+            try:
+                pkg = build_package(fields, self.distances)
+                if pkg.package_id in seen or pkg.package_id in self.package_hash:
+                    raise ValueError(f"duplicate package ID {pkg.package_id}")
+            except ValueError as e:
+                self.quarantine.append(QuarantinedRow(source, line_number, row, str(e)))
+                continue
+            seen.add(pkg.package_id)
+            chunk.append(pkg)
+            if len(chunk) >= self.chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _ingest(self, lines, source, has_header, on_package):
+        stats = IngestStats()
+        quarantined_before = len(self.quarantine)
+        start = time.perf_counter()
+        for chunk in self.iter_chunks(lines, source, has_header):
+            self.package_hash.insert_many((pkg.package_id, pkg) for pkg in chunk)
+            stats.accepted += len(chunk)
+            if on_package is not None:
+                for pkg in chunk:
+                    on_package(pkg)
+        stats.seconds = time.perf_counter() - start
+        stats.quarantined = len(self.quarantine) - quarantined_before
+        stats.rows = stats.accepted + stats.quarantined
+        self.stats.rows += stats.rows
+        self.stats.accepted += stats.accepted
+        self.stats.quarantined += stats.quarantined
+        self.stats.seconds += stats.seconds
+        return stats
+
+    @profiled()
+    def ingest_file(self, filename, on_package=None):
+        """Stream a whole manifest file (with header) into the table; returns this call's IngestStats."""
+        with open(filename, 'r', encoding='utf-8-sig', newline='') as f:
+            return self._ingest(f, filename, True, on_package)
+
+    def append(self, lines, source="<late arrivals>", has_header=False, on_package=None):
+        """
+        Ingest late-arriving rows into the table that is already in use. Without a header the
+        rows use the layout of the first manifest ingested. on_package(pkg) is called for every
+        new package, e.g. to hand it to the load planner or the event engine.
+        """
+        return self._ingest(lines, source, has_header, on_package)
@@ -0,0 +1,218 @@
+# load_planner.py
+"""
+Load Planner
+Turns each package's special note into structured constraints and assigns packages to trucks:
+  • "Can only be on truck N"            -> the package (and its group) is pinned to truck N.
+  • "Must be delivered with A, B"       -> the packages form one group that rides the same truck.
+  • "Delayed on flight ... until H:MM"  -> only trucks leaving the hub at or after H:MM can carry it.
+  • "Wrong address listed"              -> it cannot be delivered before its address correction, whose
+                                           time comes from the corrections passed to plan_truck_loads
+                                           (ADDRESS_CORRECTIONS below).
+Groups are placed most-constrained first, then by deadline, each onto the eligible truck with
+spare capacity (package count and weight) whose current stops are closest, or whose depot is
+closest while it is empty (geographic clustering over the distance matrix). A truck whose shift
+is over takes nothing. Packages with a deadline before EOD lean toward trucks that leave earlier.
+"""
+
+import re
+from datetime import timedelta
+from profiler import profiled
+from user_interface import deadline_to_timedelta
+
+TRUCK_ONLY = re.compile(r"can only be on truck\s*(\d+)", re.IGNORECASE)
+DELIVER_WITH = re.compile(r"must be delivered with\s*([\d,\s]+)", re.IGNORECASE)
+DELAYED = re.compile(r"delayed on flight(?:.*?until\s*(\d{1,2}:\d{2})\s*([ap]\.?m))?", re.IGNORECASE)
+WRONG_ADDRESS = re.compile(r"wrong address listed", re.IGNORECASE)
+
+FLIGHT_ARRIVAL_TIME = timedelta(minutes=65)  # 9:05 AM, used when a delay note gives no time
+EOD = timedelta(hours=9)
+
+#  Address Corrections
+#  (package_id, time, new_address): package 9's listed address is wrong; the correct one becomes
+#  known at 10:20 AM. Only applied to packages whose note says the address is wrong.
+ADDRESS_CORRECTIONS = [
+    (9, timedelta(hours=2, minutes=20), "Third District Juvenile Court 410 S State St, Salt Lake City, UT 84111"),
+]
+
+class PackageConstraints:
+    def __init__(self, truck_only=None, deliver_with=(), available_time=None, wrong_address=False,
+                 correction_time=None):
+        self.truck_only = truck_only  # Truck ID the package must ride on
+        self.deliver_with = set(deliver_with)  # Package IDs that must share its truck
+        self.available_time = available_time  # When the package reaches the hub
+        self.wrong_address = wrong_address  # The listed address is wrong until it is corrected
+        self.correction_time = correction_time  # When the correct address becomes known, see apply_corrections
+
+    @property
+    def release_time(self):
+        """Earliest time the package can be delivered, as a timedelta from 8:00 AM."""
+        release = self.available_time or timedelta(0)
+        if self.wrong_address and self.correction_time is not None:
+            release = max(release, self.correction_time)
+        return release
+
+def parse_special_note(note):
+    note = note or ""
+    constraints = PackageConstraints()
+    match = TRUCK_ONLY.search(note)
+    if match:
+        constraints.truck_only = int(match.group(1))
+    match = DELIVER_WITH.search(note)
+    if match:
+        constraints.deliver_with = {int(pid) for pid in re.findall(r"\d+", match.group(1))}
+    match = DELAYED.search(note)
+    if match:
+        if match.group(1):
+            clock = f"{match.group(1)} {match.group(2).replace('.', '').upper()}"
+            constraints.available_time = deadline_to_timedelta(clock)
+        else:
+            constraints.available_time = FLIGHT_ARRIVAL_TIME
+    if WRONG_ADDRESS.search(note):
+        constraints.wrong_address = True
+    return constraints
+
+def constraints_of(pkg):
+    if pkg.constraints is None:
+        pkg.constraints = parse_special_note(pkg.special_note)
+    return pkg.constraints
+
+def apply_corrections(packages, corrections):
+    """
+    Records when each wrong-address package's correction becomes known. corrections is a list of
+    (package_id, time, new_address); entries for packages without a wrong-address note are ignored.
+    """
+    by_id = {pkg.package_id: pkg for pkg in packages}
+    for pid, when, _ in corrections:
+        pkg = by_id.get(pid)
+        if pkg is None:
+            continue
+        c = constraints_of(pkg)
+        if c.wrong_address and (c.correction_time is None or when < c.correction_time):
+            c.correction_time = when
+
+class _Group:
+    def __init__(self):
+        self.packages = []
+        self.truck_only = None
+        self.available_time = timedelta(0)
+        self.deadline = EOD
+        self.weight = 0.0
+        self.stops = set()
+
+    def add(self, pkg):
+        c = constraints_of(pkg)
+        if c.truck_only is not None:
+            if self.truck_only is not None and self.truck_only != c.truck_only:
+                raise ValueError(f"Package {pkg.package_id} is grouped with packages pinned to truck {self.truck_only}, "
+                                 f"but can only be on truck {c.truck_only}.")
+            self.truck_only = c.truck_only
+        if c.available_time is not None:
+            self.available_time = max(self.available_time, c.available_time)
+        self.deadline = min(self.deadline, pkg.deadline_time)
+        self.weight += pkg.weight_kg
+        self.packages.append(pkg)
+        self.stops.add(pkg.address_index)
+
+def build_groups(packages, strict=True):
+    """
+    Union the "must be delivered with" notes into groups of packages that share a truck.
+    A note naming a package that is not in the list raises ValueError, or with strict=False is
+    ignored (the partner was already delivered or is on another truck).
+    """
+    by_id = {pkg.package_id: pkg for pkg in packages}
+    parent = {pid: pid for pid in by_id}
+
+    def find(pid):
+        while parent[pid] != pid:
+            parent[pid] = parent[parent[pid]]
+            pid = parent[pid]
+        return pid
+
+    for pkg in packages:
+        for other in constraints_of(pkg).deliver_with:
+            if other not in by_id:
+                if not strict:
+                    continue
+                raise ValueError(f"Package {pkg.package_id} must be delivered with unknown package {other}.")
+            parent[find(other)] = find(pkg.package_id)
+    groups = {}
+    for pkg in packages:
+        groups.setdefault(find(pkg.package_id), _Group()).add(pkg)
+    return list(groups.values())
+
+class _Load:
+    def __init__(self, truck):
+        self.truck = truck
+        self.packages = []
+        self.weight = 0.0
+        self.stops = set()
+
+    def can_take(self, group, on_time=True):
+        truck = self.truck
+        if not truck.can_carry(group.packages, len(self.packages), self.weight):
+            return False
+        if group.truck_only is not None and group.truck_only != truck.truck_id:
+            return False
+        # current_time is when the truck next leaves its depot (its departure time before the first trip).
+        if truck.current_time < group.available_time:
+            return False
+        if truck.shift_end is not None and truck.current_time >= truck.shift_end:
+            return False
+        return not on_time or truck.current_time <= group.deadline
+
+    def distance_to(self, group, distances):
+        """Closest distance between the group's stops and this load's stops (the truck's depot while empty)."""
+        targets = self.stops or {self.truck.hub_index}
+        best = None
+        for stop in group.stops:
+            row = distances.row(stop)
+            for target in targets:
+                if best is None or row[target] < best:
+                    best = row[target]
+        return best
+
+@profiled()
+def plan_truck_loads(packages, truck_list, distances, strict=True, corrections=()):
+    """
+    Clears every truck and loads it with a constraint-respecting, geographically clustered
+    share of the packages. Groups whose deadline no truck can meet are placed late rather than
+    dropped. If some group still fits on no truck, raises ValueError, or with strict=False
+    leaves it out and returns the packages that were not loaded. corrections (see
+    apply_corrections) set when wrong-address packages are released.
+    """
+    apply_corrections(packages, corrections)
+    groups = build_groups(packages, strict)
+    loads = [_Load(truck) for truck in truck_list]
+    leftovers = []
+    # Most constrained groups first: pinned, then delayed, then by deadline and size.
+    groups.sort(key=lambda g: (g.truck_only is None, -g.available_time.total_seconds(), g.deadline, -len(g.packages)))
+    for group in groups:
+        best = _closest_load(group, loads, distances, True) or _closest_load(group, loads, distances, False)
+        if best is None:
+            if strict:
+                ids = ", ".join(str(pkg.package_id) for pkg in group.packages)
+                raise ValueError(f"No truck can carry package(s) {ids}.")
+            leftovers.extend(group.packages)
+            continue
+        best.packages.extend(group.packages)
+        best.weight += group.weight
+        best.stops.update(group.stops)
+    for load in loads:
+        load.truck.packages.clear()
+        for pkg in sorted(load.packages, key=lambda p: p.package_id):
+            load.truck.load_package(pkg)
+    return leftovers
+
+def _closest_load(group, loads, distances, on_time):
+    best = None
+    best_score = None
+    for load in loads:
+        if not load.can_take(group, on_time):
+            continue
+        score = load.distance_to(group, distances)
+        if group.deadline < EOD:
+            # Miles the truck could have driven before it leaves: urgent packages prefer early trucks.
+            score += load.truck.current_time.total_seconds() / 3600.0 * load.truck.speed_mph
+        if best_score is None or score < best_score:
+            best, best_score = load, score
+    return best
@@ -2,27 +2,46 @@
 """
 Package
 Defines the Package class to store package details.
+Packages use __slots__ (no per-instance __dict__), and the deadline and weight are parsed once
+into numeric fields so routing never re-runs strptime. Repeated strings such as city, state,
+ZIP code and deadline are interned so large manifests share one copy of each.
 """
 
+import sys
+from user_interface import deadline_to_timedelta
+
 class Package:
+    __slots__ = ("package_id", "address", "address_index", "city", "state", "zip_code", "deadline",
+                 "deadline_time", "deadline_minutes", "weight", "weight_kg", "special_note", "status",
+                 "delivery_time", "loaded_time", "truck_id", "assigned_truck", "original_address", "constraints")
+
     def __init__(self, package_id, full_address, city, state, zip_code, deadline, weight, special_note=""):
         self.package_id = package_id
         self.address = full_address  # For output
-        self.city = city
-        self.state = state
-        self.zip_code = zip_code
-        self.deadline = deadline
-        self.weight = weight
-        self.special_note = special_note
+        self.address_index = None  # Row of this address in the distance matrix
+        self.city = sys.intern(city)
+        self.state = sys.intern(state)
+        self.zip_code = sys.intern(zip_code)
+        self.deadline = sys.intern(deadline)  # As listed, e.g. "10:30 AM" or "EOD"
+        self.deadline_time = deadline_to_timedelta(deadline)  # timedelta from 8:00 AM
+        self.deadline_minutes = self.deadline_time.total_seconds() / 60.0
+        self.weight = sys.intern(weight)  # As listed, for output
+        self.weight_kg = float(weight) if weight else 0.0
+        self.special_note = sys.intern(special_note)
         self.status = "At Hub"  # Options: "At Hub", "En Route", "Delivered"
         self.delivery_time = None
+        self.loaded_time = None  # When the package left the hub, if the event engine tracked it
         self.truck_id = None  # Truck that delivered the package
         self.assigned_truck = None
         self.original_address = None  # To store the wrong address for package #9
+        self.constraints = None  # PackageConstraints parsed from special_note (see load_planner.py)
 
     def is_truck_assigned(self):
         return self.assigned_truck is not None
 
+    def is_late(self):
+        return self.delivery_time is not None and self.delivery_time > self.deadline_time
+
     def __str__(self):
         dt_str = str(self.delivery_time) if self.delivery_time else "N/A"
         return (f"Package {self.package_id}: {self.address} | Deadline: {self.deadline} | "
@@ -0,0 +1,222 @@
+# plan_cache.py
+"""
+Plan Cache
+Saves a finished run -- the distance matrix, the loaded packages with their resolved address
+indices, each truck's plan and delivery log, and the event timeline -- to one binary file, so a
+restart with unchanged inputs skips parsing, planning and simulation.
+  - The cache key is a SHA-256 over the bytes of the manifest and distance table, the planner
+    settings and the source files that parse the inputs, make the plan and simulate it
+    (PLANNER_MODULES). Editing any of them gives a new key (a miss).
+  - Numeric data is stored as raw, 8-byte aligned arrays after a small JSON header. On load the
+    file is memory-mapped and the distance matrix and timeline columns are views into the map,
+    so nothing is copied or parsed until it is read.
+  - A missing, stale or unreadable file is just a miss; the caller rebuilds and saves again.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from datetime import timedelta
+from delivery_log import DeliveryLog
+from distance_matrix import DistanceMatrix
+from load_planner import ADDRESS_CORRECTIONS
+from package import Package
+from timeline import Timeline
+from truck import Truck
+
+MAGIC = b"WGUPSPC1"
+FORMAT_VERSION = 3
+# Changing how inputs are read or plans are made must invalidate plans made the old way: parsing
+# and address resolution, planning and routing, the simulation (main.run_simulation) and what
+# gets saved. ADDRESS_CORRECTIONS is part of every key as well.
+PLANNER_MODULES = ("main.py", "ingestion.py", "package.py", "user_interface.py", "address_index.py",
+                   "distance_matrix.py", "fleet_config.py", "truck.py", "driver.py", "delivery_log.py",
+                   "load_planner.py", "route_optimizer.py", "spatial_index.py", "deadline_scheduler.py",
+                   "event_engine.py", "timeline.py")
+
+def cache_key(input_files, settings):
+    """
+    SHA-256 hex digest over the input files' bytes, the settings (JSON-able), the address
+    corrections and the planner sources.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{FORMAT_VERSION}:{sys.byteorder}".encode())
+    here = os.path.dirname(os.path.abspath(__file__))
+    for path in list(input_files) + [os.path.join(here, name) for name in PLANNER_MODULES]:
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+    corrections = [(pid, when.total_seconds(), address) for pid, when, address in ADDRESS_CORRECTIONS]
+    digest.update(json.dumps(corrections).encode())
+    return digest.hexdigest()
+
+class PlanCache:
+    def __init__(self, directory=".plan_cache"):
+        self.directory = directory
+        self._maps = []  # Open memory maps; views handed out by load() point into them
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.plan")
+
+    #  Saving
+
+    def save(self, key, distances, packages, truck_list, timeline):
+        """Write one plan file for key (atomically) and remove plans saved under other keys."""
+        packages = sorted(packages, key=lambda pkg: pkg.package_id)
+        nan = float('nan')
+        columns = {
+            "distances": array('d', distances.data),
+            "pkg_ids": array('i', (p.package_id for p in packages)),
+            "pkg_address_index": array('i', (-1 if p.address_index is None else p.address_index for p in packages)),
+            "pkg_truck": array('i', (p.truck_id or 0 for p in packages)),
+            "pkg_assigned": array('i', (p.assigned_truck or 0 for p in packages)),
+            "pkg_delivered": array('d', (nan if p.delivery_time is None else p.delivery_time.total_seconds()
+                                         for p in packages)),
+            "pkg_loaded": array('d', (nan if p.loaded_time is None else p.loaded_time.total_seconds()
+                                      for p in packages)),
+        }
+        trucks = []
+        for truck in truck_list:
+            log = truck.delivery_log
+            for name in ("times", "mileage", "delivered", "loaded", "loaded_until"):
+                columns[f"truck{truck.truck_id}_{name}"] = getattr(log, name)
+            trucks.append({
+                "truck_id": truck.truck_id,
+                "departure": truck.departure_time.total_seconds(),
+                "speed": truck.speed_mph,
+                "capacity": truck.capacity,
+                "max_weight": truck.max_weight,
+                "depot": truck.hub_address,
+                "depot_index": truck.hub_index,
+                "shift_start": truck.shift_start.total_seconds(),
+                "shift_end": None if truck.shift_end is None else truck.shift_end.total_seconds(),
+                "mileage": truck.mileage,
+                "trip_starts": [start.total_seconds() for start in truck.trip_starts],
+                "trip_reports": truck.trip_reports,
+                "route_report": truck.route_report,
+                "locations": log.locations,
+            })
+        timeline_columns, timeline_strings = timeline.to_columns()
+        for name, values in timeline_columns.items():
+            columns[f"timeline_{name}"] = values
+        header = {
+            "key": key,
+            "addresses": distances.addresses,
+            "packages": [[p.original_address or p.address, p.address, p.city, p.state, p.zip_code, p.deadline,
+                          p.weight, p.special_note, p.status] for p in packages],
+            "trucks": trucks,
+            "timeline": timeline_strings,
+            "sections": {},
+        }
+        blobs = []
+        offset = 0
+        for name, values in columns.items():
+            data = values.tobytes() if isinstance(values, array) else array(values.format, values).tobytes()
+            typecode = values.typecode if isinstance(values, array) else values.format
+            header["sections"][name] = [offset, typecode, len(values)]
+            blobs.append(data + b"\0" * (-len(data) % 8))
+            offset += len(blobs[-1])
+        meta = json.dumps(header, separators=(",", ":")).encode("utf-8")
+        meta += b" " * (-(len(MAGIC) + 8 + len(meta)) % 8)
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(key)
+        temp = path + ".tmp"
+        with open(temp, 'wb') as f:
+            f.write(MAGIC + struct.pack("<Q", len(meta)) + meta)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(temp, path)
+        for name in os.listdir(self.directory):
+            if name.endswith(".plan") and name != os.path.basename(path):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass  # e.g. still mapped by another process on Windows
+        return path
+
+    #  Loading
+
+    def load(self, key):
+        """
+        Returns (distances, packages, truck_list, timeline) saved under key, or None on a miss.
+        packages is a list sorted by package ID.
+        """
+        path = self.path_for(key)
+        try:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # Missing file, or an empty one mmap refuses
+            return None
+        try:
+            return self._read(mapped, key)
+        except (ValueError, KeyError, IndexError, TypeError, struct.error):
+            return None  # The map is released with the last view into it
+
+    def _read(self, mapped, key):
+        view = memoryview(mapped)
+        if bytes(view[:len(MAGIC)]) != MAGIC:
+            raise ValueError("Not a plan cache file.")
+        (meta_length,) = struct.unpack_from("<Q", mapped, len(MAGIC))
+        base = len(MAGIC) + 8 + meta_length
+        header = json.loads(bytes(view[len(MAGIC) + 8:base]))
+        if header["key"] != key:
+            raise ValueError("Plan cache key mismatch.")
+
+        def column(name):
+            offset, typecode, count = header["sections"][name]
+            start = base + offset
+            end = start + count * array(typecode).itemsize
+            if end > len(mapped):
+                raise ValueError(f"Plan cache section {name} is truncated.")
+            return view[start:end].cast(typecode)
+
+        distances = DistanceMatrix(header["addresses"], column("distances"))
+        ids, indices = column("pkg_ids"), column("pkg_address_index")
+        trucks_of, assigned = column("pkg_truck"), column("pkg_assigned")
+        delivered, loaded = column("pkg_delivered"), column("pkg_loaded")
+        packages = []
+        for i, fields in enumerate(header["packages"]):
+            listed, address, city, state, zip_code, deadline, weight, note, status = fields
+            pkg = Package(ids[i], listed, city, state, zip_code, deadline, weight, note)
+            pkg.address = address
+            pkg.original_address = listed
+            pkg.address_index = indices[i] if indices[i] >= 0 else None
+            pkg.truck_id = trucks_of[i] or None
+            pkg.assigned_truck = assigned[i] or None
+            pkg.status = status
+            if delivered[i] == delivered[i]:  # NaN marks "never"
+                pkg.delivery_time = timedelta(seconds=delivered[i])
+            if loaded[i] == loaded[i]:
+                pkg.loaded_time = timedelta(seconds=loaded[i])
+            packages.append(pkg)
+
+        truck_list = []
+        for info in header["trucks"]:
+            shift_end = info["shift_end"]
+            truck = Truck(info["truck_id"], timedelta(seconds=info["departure"]), info["speed"], info["capacity"],
+                          info["max_weight"], info["depot_index"], info["depot"],
+                          None if shift_end is None else timedelta(seconds=shift_end))
+            truck.shift_start = timedelta(seconds=info["shift_start"])
+            truck.mileage = info["mileage"]
+            truck.trip_starts = [timedelta(seconds=start) for start in info["trip_starts"]]
+            truck.trip_reports = info["trip_reports"]
+            truck.route_report = info["route_report"]
+            log = DeliveryLog()
+            for name in ("times", "mileage", "delivered", "loaded", "loaded_until"):
+                getattr(log, name).frombytes(column(f"truck{truck.truck_id}_{name}").tobytes())
+            log.locations = info["locations"]
+            if len(log):
+                truck.current_time = timedelta(seconds=log.times[-1])
+                truck.current_location = log.locations[-1]
+            truck.delivery_log = log
+            truck_list.append(truck)
+
+        prefix = "timeline_"
+        timeline_columns = {name[len(prefix):]: column(name) for name in header["sections"] if name.startswith(prefix)}
+        timeline = Timeline.from_columns(timeline_columns, header["timeline"])
+        self._maps.append(mapped)
+        return distances, packages, truck_list, timeline
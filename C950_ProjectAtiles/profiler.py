@@ -0,0 +1,213 @@
+# profiler.py
+"""
+Profiler
+Optional instrumentation of the pipeline stages: CSV load, address resolution, load planning,
+routing, simulation and reporting. Functions marked @profiled(...) and blocks inside
+stage(...) are timed while a Profiler is active; otherwise each costs a single global check.
+For every call path (e.g. run_simulation;RouteOptimizer.optimize;2-opt) it records:
+  - call count, total and self wall time,
+  - net allocated memory blocks (sys.getallocatedblocks),
+  - routing steps and candidate routes evaluated per step (record_step).
+Results export as JSON or as folded stacks ("a;b;c <microseconds>") for flamegraph.pl/speedscope.
+
+Usage:
+  python profiler.py --json profile.json --folded profile.folded
+"""
+
+import argparse
+import contextlib
+import functools
+import io
+import json
+import sys
+import time
+
+_active = None  # The running Profiler, or None when profiling is off
+_NO_STAGE = contextlib.nullcontext()
+
+class _Frame:
+    __slots__ = ("calls", "seconds", "self_seconds", "blocks", "steps")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        self.self_seconds = 0.0
+        self.blocks = 0  # Net memory blocks allocated, children included
+        self.steps = {}  # Step name -> [steps, candidates, most candidates in one step]
+
+class Profiler:
+    def __init__(self):
+        self.frames = {}  # Call path (tuple of stage names) -> _Frame
+        self._stack = []  # [path, start time, time spent in children, allocated blocks at start]
+        self.started = None
+        self.seconds = 0.0
+
+    def __enter__(self):
+        global _active
+        if _active is not None:
+            raise ValueError("A profiler is already active.")
+        _active = self
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global _active
+        _active = None
+        self.seconds += time.perf_counter() - self.started
+
+    #  Recording
+
+    def enter(self, name):
+        path = self._stack[-1][0] + (name,) if self._stack else (name,)
+        self._stack.append([path, time.perf_counter(), 0.0, sys.getallocatedblocks()])
+
+    def exit(self):
+        path, start, children, blocks = self._stack.pop()
+        elapsed = time.perf_counter() - start
+        frame = self._frame(path)
+        frame.calls += 1
+        frame.seconds += elapsed
+        frame.self_seconds += elapsed - children
+        frame.blocks += sys.getallocatedblocks() - blocks
+        if self._stack:
+            self._stack[-1][2] += elapsed
+
+    def step(self, name, candidates):
+        frame = self._frame(self._stack[-1][0] if self._stack else ("<top>",))
+        totals = frame.steps.get(name)
+        if totals is None:
+            totals = frame.steps[name] = [0, 0, 0]
+        totals[0] += 1
+        totals[1] += candidates
+        if candidates > totals[2]:
+            totals[2] = candidates
+
+    def _frame(self, path):
+        frame = self.frames.get(path)
+        if frame is None:
+            frame = self.frames[path] = _Frame()
+        return frame
+
+    #  Export
+
+    def to_dict(self):
+        stages = []
+        for path, frame in sorted(self.frames.items(), key=lambda item: -item[1].seconds):
+            stages.append({
+                "stack": ";".join(path),
+                "calls": frame.calls,
+                "seconds": frame.seconds,
+                "self_seconds": frame.self_seconds,
+                "allocated_blocks": frame.blocks,
+                "steps": {name: {"steps": steps, "candidates": candidates, "max_candidates": most,
+                                 "candidates_per_step": candidates / steps if steps else 0.0}
+                          for name, (steps, candidates, most) in frame.steps.items()},
+            })
+        return {"total_seconds": self.seconds, "stages": stages}
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write("\n")
+
+    def folded(self):
+        """Folded-stack lines weighted by self time in microseconds."""
+        return [f"{';'.join(path)} {round(frame.self_seconds * 1e6)}"
+                for path, frame in sorted(self.frames.items()) if frame.self_seconds > 0]
+
+    def write_folded(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for line in self.folded():
+                f.write(line + "\n")
+
+    def summary(self, limit=20):
+        lines = [f"{'Self s':>9} {'Total s':>9} {'Calls':>8}  Stage"]
+        ordered = sorted(self.frames.items(), key=lambda item: -item[1].self_seconds)
+        for path, frame in ordered[:limit]:
+            lines.append(f"{frame.self_seconds:>9.4f} {frame.seconds:>9.4f} {frame.calls:>8}  {';'.join(path)}")
+        return "\n".join(lines)
+
+#  Hooks used by the instrumented modules
+
+def profiled(name=None):
+    """Decorator: time every call of the function as stage `name` (default: its qualified name)."""
+    def decorate(func):
+        label = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _active
+            if profiler is None:
+                return func(*args, **kwargs)
+            profiler.enter(label)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.exit()
+        return wrapper
+    return decorate
+
+@contextlib.contextmanager
+def _timed(profiler, name):
+    profiler.enter(name)
+    try:
+        yield
+    finally:
+        profiler.exit()
+
+def stage(name):
+    """Context manager timing a block as stage `name`; a shared no-op when profiling is off."""
+    return _timed(_active, name) if _active is not None else _NO_STAGE
+
+def record_step(name, candidates):
+    """Count one routing step that evaluated `candidates` candidate stops or routes."""
+    if _active is not None:
+        _active.step(name, candidates)
+
+#  Command line
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile one WGUPS run: load, plan, route, simulate and report.")
+    parser.add_argument("--packages", default="packages.csv")
+    parser.add_argument("--distances", default="distances.csv")
+    parser.add_argument("--trucks", type=int, default=3)
+    parser.add_argument("--drivers", type=int, default=2)
+    parser.add_argument("--fleet", help="fleet config file; replaces --trucks and --drivers")
+    parser.add_argument("--json", help="write the profile as JSON here")
+    parser.add_argument("--folded", help="write folded stacks (flame graph input) here")
+    args = parser.parse_args(argv)
+
+    # Imported here: main imports this module. Run as a script this file is __main__, so the
+    # Profiler must come from the imported module the instrumented code checks.
+    from datetime import timedelta
+    from profiler import Profiler, stage
+    from hash_table import HashTable
+    from main import (initialize_fleet, initialize_trucks_drivers, load_address_data, load_packages_into_hash,
+                      run_simulation, show_general_report, show_package_status)
+    from timeline import Timeline
+    with Profiler() as profiler:
+        with contextlib.redirect_stdout(io.StringIO()):
+            distances = load_address_data(args.distances)
+            package_hash = HashTable()
+            load_packages_into_hash(args.packages, package_hash, distances)
+            if args.fleet:
+                truck_list, _ = initialize_fleet(args.fleet, distances)
+            else:
+                truck_list, _ = initialize_trucks_drivers(args.trucks, args.drivers)
+            engine = run_simulation(package_hash, truck_list, distances)
+            with stage("Timeline.from_simulation"):
+                timeline = Timeline.from_simulation(package_hash.values(), truck_list, engine.corrections,
+                                                    engine.cancellations)
+            for hours in (1, 2, 5):
+                show_general_report(package_hash, timeline, timedelta(hours=hours))
+            for pid in timeline.package_order:
+                show_package_status(package_hash, pid, timeline, timedelta(hours=2))
+    if args.json:
+        profiler.write_json(args.json)
+    if args.folded:
+        profiler.write_folded(args.folded)
+    print(profiler.summary())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,330 @@
+# query_service.py
+"""
+Query Service
+A local HTTP/JSON service over a finished simulation, for tools that need package status at a
+high query rate instead of the interactive menu. It runs on asyncio, so many connections are
+served concurrently (with keep-alive) from one thread. Times are 'HH:MM AM/PM' or 24-hour 'HH:MM'.
+  GET  /packages?time=T[&ids=1,2,3]   status of many (default: all) packages at T
+  POST /packages                      the same, with a JSON body {"time": T, "ids": [...]}
+  GET  /packages/<id>?time=T          status of one package at T
+  GET  /fleet/mileage?time=T          total and per-truck mileage at T
+  GET  /trucks?time=T                 every truck's last stop and mileage at T
+  GET  /trucks/<id>/position?time=T   one truck's last stop and mileage at T
+  GET  /health                        package/truck counts and cache statistics
+Every answer for a time T is cut from one time slice -- all package and truck states at T --
+built in a single pass over the timeline and kept in a small LRU cache of recent times. On a
+cache miss the slice is built in a worker thread, so other connections are not held up; requests
+for a time whose slice is already being built wait for that build instead of starting another.
+
+Usage:
+  python query_service.py --port 8080
+"""
+
+import argparse
+import asyncio
+import json
+from collections import OrderedDict
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+from hash_table import HashTable
+from main import initialize_fleet, load_address_data, load_packages_into_hash, run_simulation
+from timeline import Timeline
+from user_interface import convert_delta_to_time_str, parse_report_time
+
+class _TimeSlice:
+    def __init__(self, when, at, packages, trucks, fleet_miles):
+        self.when = when  # The report time as a timedelta
+        self.at = at  # The same time as text
+        self.packages = packages  # Package ID -> JSON-ready state
+        self.trucks = trucks  # Truck ID -> JSON-ready position
+        self.fleet_miles = fleet_miles
+
+class QueryService:
+    def __init__(self, package_hash, timeline, cache_size=128):
+        self.package_hash = package_hash
+        self.timeline = timeline
+        self.cache_size = cache_size
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.requests = 0
+        self._slices = OrderedDict()  # Seconds after 8:00 AM -> _TimeSlice, least recently used first
+        self._building = {}  # Seconds after 8:00 AM -> future of the slice being built in the executor
+
+    #  Time slices
+
+    def time_slice(self, at):
+        cached = self._cached_slice(at)
+        return cached if cached is not None else self._store_slice(at, self._build_slice(at))
+
+    async def time_slice_async(self, at):
+        """
+        time_slice() for the event loop: a missing slice is built in the default executor, once
+        per time however many requests ask for it while it is being built.
+        """
+        cached = self._cached_slice(at)
+        if cached is not None:
+            return cached
+        key = at.total_seconds()
+        building = self._building.get(key)
+        if building is None:
+            building = asyncio.get_running_loop().run_in_executor(None, self._build_slice, at)
+            self._building[key] = building
+            building.add_done_callback(lambda done: self._finish_slice(at, done))
+        else:
+            self.cache_hits += 1  # Served by the build already in flight
+        # Shielded, so one cancelled request does not cancel the build for the others.
+        return await asyncio.shield(building)
+
+    def _finish_slice(self, at, done):
+        """Runs before any waiter resumes: caches a finished build; a failed one is not kept."""
+        del self._building[at.total_seconds()]
+        if not done.cancelled() and done.exception() is None:
+            self._store_slice(at, done.result())
+
+    def _cached_slice(self, at):
+        cached = self._slices.get(at.total_seconds())
+        if cached is not None:
+            self._slices.move_to_end(at.total_seconds())
+            self.cache_hits += 1
+        return cached
+
+    def _store_slice(self, at, built):
+        self.cache_misses += 1
+        self._slices[at.total_seconds()] = built
+        if len(self._slices) > self.cache_size:
+            self._slices.popitem(last=False)
+        return built
+
+    def _build_slice(self, at):
+        time_str = convert_delta_to_time_str(at)
+        packages = {}
+        for _, states in self.timeline.sweep([at]):
+            for state in states:
+                pkg = self.package_hash.lookup(state["package_id"])
+                packages[state["package_id"]] = {
+                    "package_id": state["package_id"],
+                    "address": state["address"],
+                    "deadline": pkg.deadline,
+                    "weight": pkg.weight,
+                    "special_notes": pkg.special_note or None,
+                    "status": state["status"],
+                    "delivery_time": convert_delta_to_time_str(state["delivery_time"]) if state["delivery_time"] else None,
+                    "truck_id": state["truck_id"],
+                    "time": time_str,
+                }
+        trucks = {}
+        for truck_id in self.timeline.truck_ids_in_order():
+            trucks[truck_id] = {
+                "truck_id": truck_id,
+                "location": self.timeline.truck_location(truck_id, at),
+                "mileage": round(self.timeline.truck_mileage(truck_id, at), 2),
+                "time": time_str,
+            }
+        return _TimeSlice(at, time_str, packages, trucks, round(self.timeline.fleet_mileage(at), 2))
+
+    #  Routing
+
+    async def handle_async(self, method, target, body=b""):
+        """handle() for the event loop: the request's time slice is looked up or built first, off the loop."""
+        prepared = None
+        try:
+            at = self._request_time(method, target, body)
+        except ValueError:
+            at = None  # handle() reports the error
+        if at is not None:
+            prepared = await self.time_slice_async(at)
+        return self.handle(method, target, body, prepared)
+
+    def _request_time(self, method, target, body):
+        """The report time a request asks about, or None."""
+        url = urlsplit(target)
+        if method == "POST":
+            request = json.loads(body or b"{}")
+            text = request.get("time") if isinstance(request, dict) else None
+        else:
+            text = parse_qs(url.query).get("time", [None])[-1]
+        return self._time(text) if text is not None else None
+
+    def handle(self, method, target, body=b"", prepared=None):
+        """
+        Answer one request; returns (HTTP status, JSON-ready payload). Never raises for bad input.
+        prepared is the request's time slice if the caller already has it (see handle_async).
+        """
+        self.requests += 1
+        url = urlsplit(target)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        parts = [part for part in url.path.split("/") if part]
+        try:
+            if method == "POST" and parts == ["packages"]:
+                request = json.loads(body or b"{}")
+                if not isinstance(request, dict):
+                    raise ValueError("Request body must be a JSON object.")
+                return self._packages(request.get("time"), request.get("ids"), prepared)
+            if method != "GET":
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"{method} is not supported."}
+            if parts == ["health"]:
+                return HTTPStatus.OK, self._health()
+            if parts == ["packages"]:
+                ids = query.get("ids")
+                return self._packages(query.get("time"), ids.split(",") if ids else None, prepared)
+            if len(parts) == 2 and parts[0] == "packages":
+                status, payload = self._packages(query.get("time"), [parts[1]], prepared)
+                return status, payload["packages"][0] if status == HTTPStatus.OK else payload
+            if parts == ["fleet", "mileage"]:
+                time_slice = self._slice(query.get("time"), prepared)
+                return HTTPStatus.OK, {
+                    "time": time_slice.at,
+                    "total_miles": time_slice.fleet_miles,
+                    "trucks": {str(truck_id): t["mileage"] for truck_id, t in time_slice.trucks.items()},
+                }
+            if parts == ["trucks"]:
+                time_slice = self._slice(query.get("time"), prepared)
+                return HTTPStatus.OK, {"time": time_slice.at, "trucks": list(time_slice.trucks.values())}
+            if len(parts) == 3 and parts[0] == "trucks" and parts[2] == "position":
+                time_slice = self._slice(query.get("time"), prepared)
+                position = time_slice.trucks.get(self._id(parts[1]))
+                if position is None:
+                    return HTTPStatus.NOT_FOUND, {"error": f"Truck {parts[1]} not found."}
+                return HTTPStatus.OK, position
+        except ValueError as e:  # Includes malformed JSON
+            return HTTPStatus.BAD_REQUEST, {"error": str(e)}
+        return HTTPStatus.NOT_FOUND, {"error": f"No endpoint {url.path}."}
+
+    def _packages(self, time_text, ids, prepared=None):
+        time_slice = self._slice(time_text, prepared)
+        if ids is None:
+            return HTTPStatus.OK, {"time": time_slice.at, "packages": list(time_slice.packages.values())}
+        if not isinstance(ids, list):
+            raise ValueError("ids must be a list of package IDs.")
+        states = []
+        missing = []
+        for raw in ids:
+            pid = self._id(raw)
+            state = time_slice.packages.get(pid)
+            if state is None:
+                missing.append(pid)
+            else:
+                states.append(state)
+        if missing and not states:
+            return HTTPStatus.NOT_FOUND, {"error": f"Package(s) {', '.join(map(str, missing))} not found."}
+        return HTTPStatus.OK, {"time": time_slice.at, "packages": states, "missing": missing}
+
+    def _health(self):
+        return {
+            "packages": len(self.timeline.package_order),
+            "trucks": len(self.timeline.truck_ids_in_order()),
+            "requests": self.requests,
+            "cached_times": len(self._slices),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+        }
+
+    def _slice(self, time_text, prepared):
+        at = self._time(time_text)
+        if prepared is not None and prepared.when == at:
+            return prepared
+        return self.time_slice(at)
+
+    @staticmethod
+    def _time(text):
+        if text is None:
+            raise ValueError("Missing time, e.g. time=10:30 AM.")
+        return parse_report_time(str(text))
+
+    @staticmethod
+    def _id(raw):
+        try:
+            return int(str(raw).strip())
+        except ValueError:
+            raise ValueError(f"ID '{raw}' is not an integer.")
+
+    #  HTTP
+
+    async def _serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request_line = await reader.readline()
+                    if not request_line:
+                        break
+                    fields = request_line.decode("latin-1").split()
+                    headers = {}
+                    while True:
+                        line = await reader.readline()
+                        if line in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = line.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                except (ValueError, asyncio.LimitOverrunError):
+                    # readline() raises ValueError when a line is longer than the reader's limit.
+                    await self._respond(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                        {"error": "Request line or header too long."}, False)
+                    break
+                if len(fields) != 3:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed request line."}, False)
+                    break
+                method, target, version = fields
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length."}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self.handle_async(method, target, body)
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        data = json.dumps(payload).encode("utf-8")
+        head = (f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+    async def start(self, host="127.0.0.1", port=8080):
+        """Start listening and return the asyncio server (use port 0 for any free port)."""
+        return await asyncio.start_server(self._serve_connection, host, port)
+
+    async def serve_forever(self, host="127.0.0.1", port=8080):
+        server = await self.start(host, port)
+        address = server.sockets[0].getsockname()
+        print(f"Serving package queries on http://{address[0]}:{address[1]}/")
+        async with server:
+            await server.serve_forever()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve WGUPS package, truck and mileage queries over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--packages", default="packages.csv")
+    parser.add_argument("--distances", default="distances.csv")
+    parser.add_argument("--fleet", default="fleet.json", help="fleet config file (depots, trucks, drivers)")
+    parser.add_argument("--cache-size", type=int, default=128, help="recent report times kept in the cache")
+    args = parser.parse_args(argv)
+
+    distances = load_address_data(args.distances)
+    package_hash = HashTable()
+    load_packages_into_hash(args.packages, package_hash, distances)
+    truck_list, _ = initialize_fleet(args.fleet, distances)
+    engine = run_simulation(package_hash, truck_list, distances)
+    timeline = Timeline.from_simulation(package_hash.values(), truck_list, engine.corrections, engine.cancellations)
+    service = QueryService(package_hash, timeline, args.cache_size)
+    try:
+        asyncio.run(service.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        print("Stopped.")
+
+if __name__ == "__main__":
+    main()
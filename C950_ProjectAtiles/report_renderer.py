@@ -0,0 +1,167 @@
+# report_renderer.py
+"""
+Report Renderer
+Renders the package status table for one report time or a whole range of them, e.g. every
+5-minute slice of the day:
+  - Times are formatted once per minute (convert_delta_to_time_str is memoized), and each
+    package's fixed columns (deadline, weight, notes) are formatted once per renderer.
+  - A range of times is read in one pass over the timeline (Timeline.sweep).
+  - Text reports are joined and written in one call; CSV and JSON exports stream through a
+    buffered file writer, one time slice at a time.
+
+Usage:
+  python report_renderer.py --start 8:00 --end 17:00 --every 5 --csv status.csv --json status.json
+"""
+
+import argparse
+import csv
+import json
+import sys
+from datetime import timedelta
+from user_interface import convert_delta_to_time_str, parse_report_time
+
+CSV_FIELDS = ("report_time", "package_id", "address", "deadline", "weight", "special_notes", "status",
+              "delivery_time", "truck_id")
+BUFFER_SIZE = 1 << 16
+
+def report_times(start, end, every=timedelta(minutes=5)):
+    """Report times from start to end inclusive, every `every` apart."""
+    if every <= timedelta(0):
+        raise ValueError("The report interval must be positive.")
+    times = []
+    at = start
+    while at <= end:
+        times.append(at)
+        at += every
+    return times
+
+class ReportRenderer:
+    def __init__(self, package_hash, timeline):
+        self.package_hash = package_hash
+        self.timeline = timeline
+        self._middles = {}  # Package ID -> " | Deadline: ... | Status: " for the text report
+
+    def _middle(self, pid):
+        middle = self._middles.get(pid)
+        if middle is None:
+            pkg = self.package_hash.lookup(pid)
+            middle = self._middles[pid] = (f" | Deadline: {pkg.deadline} | Weight: {pkg.weight} kg | "
+                                           f"Special Notes: {pkg.special_note if pkg.special_note else 'None'} | "
+                                           f"Status: ")
+        return middle
+
+    #  Text
+
+    def general_reports(self, times):
+        """Yields (time, report text) for each time in ascending order, from one sweep of the timeline."""
+        timeline = self.timeline
+        truck_ids = timeline.truck_ids_in_order()
+        for at, states in timeline.sweep(times):
+            time_str = convert_delta_to_time_str(at)
+            lines = ["\nStatus report of all packages at " + time_str,
+                     "---------------------------------------------------------------------"]
+            for state in states:
+                pid = state["package_id"]
+                delivered = state["delivery_time"]
+                lines.append("Package " + str(pid) + ": " + state["address"] + self._middle(pid) + state["status"]
+                             + " | Delivery Time: " + (convert_delta_to_time_str(delivered) if delivered else "N/A")
+                             + " | Truck: " + (str(state["truck_id"]) if state["truck_id"] else "N/A"))
+            for truck_id in truck_ids:
+                lines.append(f"Truck {truck_id} mileage at {time_str}: {timeline.truck_mileage(truck_id, at):.2f} miles")
+            lines.append(f"Total mileage at {time_str}: {timeline.fleet_mileage(at):.2f} miles\n")
+            yield at, "\n".join(lines) + "\n"
+
+    def write_general(self, times, out=None):
+        """Writes the text report for every time to out (default: standard output)."""
+        out = out if out is not None else sys.stdout
+        for _, text in self.general_reports(times):
+            out.write(text)
+
+    #  Export
+
+    def slices(self, times):
+        """Yields (time, rows) for each time in ascending order: one CSV_FIELDS dict per package."""
+        fixed = {}
+        for at, states in self.timeline.sweep(times):
+            time_str = convert_delta_to_time_str(at)
+            rows = []
+            for state in states:
+                pid = state["package_id"]
+                pkg_fields = fixed.get(pid)
+                if pkg_fields is None:
+                    pkg = self.package_hash.lookup(pid)
+                    pkg_fields = fixed[pid] = (pkg.deadline, pkg.weight, pkg.special_note or "")
+                delivered = state["delivery_time"]
+                rows.append({
+                    "report_time": time_str,
+                    "package_id": pid,
+                    "address": state["address"],
+                    "deadline": pkg_fields[0],
+                    "weight": pkg_fields[1],
+                    "special_notes": pkg_fields[2],
+                    "status": state["status"],
+                    "delivery_time": convert_delta_to_time_str(delivered) if delivered else "",
+                    "truck_id": state["truck_id"] or "",
+                })
+            yield at, rows
+
+    def export_csv(self, path, times):
+        """Writes the status table for every report time as CSV; returns the number of rows."""
+        count = 0
+        with open(path, 'w', newline='', encoding='utf-8', buffering=BUFFER_SIZE) as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            for _, rows in self.slices(times):
+                writer.writerows(rows)
+                count += len(rows)
+        return count
+
+    def export_json(self, path, times):
+        """
+        Writes {"reports": [{"time", "packages", "trucks", "total_miles"}, ...]}, one report per time,
+        streamed slice by slice. Returns the number of reports.
+        """
+        timeline = self.timeline
+        truck_ids = timeline.truck_ids_in_order()
+        count = 0
+        with open(path, 'w', encoding='utf-8', buffering=BUFFER_SIZE) as f:
+            f.write('{"reports": [')
+            for at, rows in self.slices(times):
+                report = {
+                    "time": convert_delta_to_time_str(at),
+                    "packages": [{name: row[name] if row[name] != "" else None for name in CSV_FIELDS[1:]} for row in rows],
+                    "trucks": {str(truck_id): round(timeline.truck_mileage(truck_id, at), 2) for truck_id in truck_ids},
+                    "total_miles": round(timeline.fleet_mileage(at), 2),
+                }
+                f.write((", " if count else "") + json.dumps(report))
+                count += 1
+            f.write("]}\n")
+        return count
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export WGUPS package status reports for a range of times.")
+    parser.add_argument("--packages", default="packages.csv")
+    parser.add_argument("--distances", default="distances.csv")
+    parser.add_argument("--fleet", default="fleet.json", help="fleet config file (depots, trucks, drivers)")
+    parser.add_argument("--start", default="8:00 AM", help="first report time")
+    parser.add_argument("--end", default="5:00 PM", help="last report time")
+    parser.add_argument("--every", type=int, default=5, help="minutes between report times")
+    parser.add_argument("--csv", help="write the status table as CSV here")
+    parser.add_argument("--json", help="write the status reports as JSON here")
+    args = parser.parse_args(argv)
+
+    # Imported here: main imports this module.
+    from main import load_or_build_plan
+    _, package_hash, _, timeline = load_or_build_plan(args.packages, args.distances, fleet_file=args.fleet)
+    times = report_times(parse_report_time(args.start), parse_report_time(args.end), timedelta(minutes=args.every))
+    renderer = ReportRenderer(package_hash, timeline)
+    if args.csv:
+        print(f"Wrote {renderer.export_csv(args.csv, times)} rows to {args.csv}")
+    if args.json:
+        print(f"Wrote {renderer.export_json(args.json, times)} reports to {args.json}")
+    if not args.csv and not args.json:
+        renderer.write_general(times)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,416 @@
+# route_optimizer.py
+"""
+Route Optimizer
+Orders a truck's packages with a pipeline of pluggable strategies:
+  • NearestNeighbor builds a route by always driving to the closest package that keeps
+    the tightest remaining deadlines reachable.
+  • TwoOpt and OrOpt improve a route by reversing segments / relocating short runs of stops.
+Routes are lists of positions into a RouteContext, which holds each stop's matrix index, deadline
+and release time in minutes after 8:00 AM; a truck that reaches a stop before its package is
+released waits there. Getting back to the depot after the truck's shift ends also counts as a
+violation. A move is accepted only if it lowers (violations, miles), so improvers never trade
+lateness for mileage. Moves are priced by their change in miles; only the part of the route a
+move changes is re-timed, and only the accepted move is fully re-evaluated. Every improver runs
+under an iteration budget and a wall-clock budget checked before each move. When a route is
+still late, the DeadlineScheduler searches for an on-time order or explains why there is none.
+A route normally starts at the depot (the truck's hub), but it can start anywhere (a truck's
+current stop) so remaining stops can be re-planned mid-route.
+"""
+
+import time
+from datetime import timedelta
+from deadline_scheduler import DeadlineScheduler
+from load_planner import constraints_of
+from profiler import profiled, record_step, stage
+from spatial_index import SpatialIndex
+from user_interface import convert_delta_to_time_str
+
+EPSILON = 1e-9
+
+def _clock(minutes):
+    return convert_delta_to_time_str(timedelta(minutes=minutes))
+
+def release_minutes(pkg):
+    """Earliest time (minutes after 8:00 AM) the package can be delivered: flight arrival or address correction."""
+    return constraints_of(pkg).release_time.total_seconds() / 60.0
+
+class RouteContext:
+    def __init__(self, truck, packages, distances, start=None, start_time=None):
+        self.packages = packages
+        self.distances = distances
+        self.hub = truck.hub_index
+        self.start = truck.hub_index if start is None else start  # Matrix index the route leaves from
+        if start_time is None:
+            start_time = truck.current_time
+        self.start_time = start_time.total_seconds() / 60.0
+        self.minutes_per_mile = 60.0 / truck.speed_mph
+        # Latest return to the depot in minutes, or None when the shift has no fixed end.
+        self.shift_end = None if truck.shift_end is None else truck.shift_end.total_seconds() / 60.0
+        self.stops = [pkg.address_index for pkg in packages]
+        self.deadlines = [pkg.deadline_minutes for pkg in packages]
+        self.releases = [release_minutes(pkg) for pkg in packages]
+
+    def dist(self, a, b):
+        return self.distances.data[a * self.distances.size + b]
+
+    def node(self, route, k):
+        """Matrix index of route position k, with the start before the first stop and the hub after the last."""
+        if k < 0:
+            return self.start
+        if k >= len(route):
+            return self.hub
+        return self.stops[route[k]]
+
+    def evaluate(self, route):
+        """
+        Return (violations, miles) for a route from the start that ends back at the hub, waiting at
+        early stops. Violations are late stops, plus one if the truck gets back after its shift ends.
+        """
+        data = self.distances.data
+        size = self.distances.size
+        current = self.start
+        clock = self.start_time
+        miles = 0.0
+        violations = 0
+        for pos in route:
+            stop = self.stops[pos]
+            d = data[current * size + stop]
+            miles += d
+            clock += d * self.minutes_per_mile
+            if clock < self.releases[pos]:
+                clock = self.releases[pos]  # Wait for the package (flight or address correction)
+            if clock > self.deadlines[pos] + EPSILON:
+                violations += 1
+            current = stop
+        back = data[current * size + self.hub]
+        miles += back
+        if self.shift_end is not None and clock + back * self.minutes_per_mile > self.shift_end + EPSILON:
+            violations += 1
+        return violations, miles
+
+    def prefix(self, route):
+        """(clocks, late): clocks[k] is the time after serving route[:k] and late[k] how many of those are late."""
+        clocks = [self.start_time]
+        late = [0]
+        current = self.start
+        clock = self.start_time
+        count = 0
+        for pos in route:
+            clock = max(clock + self.dist(current, self.stops[pos]) * self.minutes_per_mile, self.releases[pos])
+            if clock > self.deadlines[pos] + EPSILON:
+                count += 1
+            clocks.append(clock)
+            late.append(count)
+            current = self.stops[pos]
+        return clocks, late
+
+    def improves(self, route, first, tail, delta, best, prefix):
+        """
+        True if route[:first] + tail beats best (violations, miles), where delta is the change in miles
+        and prefix is self.prefix(route). Only the changed tail is walked, and the walk stops as
+        soon as the candidate has too many violations to win.
+        """
+        clocks, late = prefix
+        # A shorter route may tie best on violations; any other move must remove one.
+        limit = best[0] if delta < -EPSILON else best[0] - 1
+        violations = late[first]
+        if violations > limit:
+            return False
+        data = self.distances.data
+        size = self.distances.size
+        current = self.node(route, first - 1)
+        clock = clocks[first]
+        for pos in tail:
+            stop = self.stops[pos]
+            clock += data[current * size + stop] * self.minutes_per_mile
+            if clock < self.releases[pos]:
+                clock = self.releases[pos]
+            if clock > self.deadlines[pos] + EPSILON:
+                violations += 1
+                if violations > limit:
+                    return False
+            current = stop
+        back = data[current * size + self.hub]
+        if self.shift_end is not None and clock + back * self.minutes_per_mile > self.shift_end + EPSILON:
+            violations += 1
+        return violations <= limit
+
+    def finish_time(self, route):
+        """Minutes after 8:00 AM when the route gets back to the hub."""
+        current = self.start
+        clock = self.start_time
+        for pos in route:
+            clock = max(clock + self.dist(current, self.stops[pos]) * self.minutes_per_mile, self.releases[pos])
+            current = self.stops[pos]
+        return clock + self.dist(current, self.hub) * self.minutes_per_mile
+
+class RouteStrategy:
+    """Base class for route strategies. apply() returns a new ordering of the route positions."""
+    name = "strategy"
+
+    def apply(self, context, route):
+        raise NotImplementedError
+
+class EarliestDeadline(RouteStrategy):
+    """Orders stops by deadline only; this is the order the original greedy loop produced."""
+    name = "earliest-deadline"
+
+    def apply(self, context, route):
+        return sorted(route, key=lambda pos: (context.releases[pos] > context.start_time, context.deadlines[pos]))
+
+class NearestNeighbor(RouteStrategy):
+    name = "nearest-neighbor"
+
+    def __init__(self, lookahead=3, spatial_threshold=256, candidates=8):
+        self.lookahead = lookahead  # Number of tightest deadlines that must stay reachable
+        # Above spatial_threshold stops, each step first tries only the `candidates` nearest
+        # remaining stops from a spatial index instead of scanning every remaining stop.
+        self.spatial_threshold = spatial_threshold
+        self.candidates = candidates
+
+    def apply(self, context, route):
+        remaining = set(route)
+        urgent = sorted(route, key=lambda pos: context.deadlines[pos])
+        index = None
+        if len(remaining) > self.spatial_threshold:
+            index = SpatialIndex.for_distances(context.distances)
+            at_stop = {}  # Matrix index -> remaining positions there
+            for pos in route:
+                index.insert(context.stops[pos])
+                at_stop.setdefault(context.stops[pos], []).append(pos)
+        order = []
+        current = context.start
+        clock = context.start_time
+        mpm = context.minutes_per_mile
+        while remaining:
+            pool = remaining
+            if index is not None:
+                pool = [pos for stop in index.nearest(current, self.candidates) for pos in at_stop[stop]]
+            best, fallback = self._choose(context, pool, urgent, remaining, current, clock)
+            if best is None and pool is not remaining:
+                best, fallback = self._choose(context, remaining, urgent, remaining, current, clock)
+                pool = remaining
+            if best is None:
+                # Nothing is on time any more: take the most urgent available stop,
+                # or the earliest released one if every remaining package is still in flight.
+                best = fallback if fallback is not None else min(remaining, key=lambda p: context.releases[p])
+            d = context.dist(current, context.stops[best])
+            clock = max(clock + d * mpm, context.releases[best])
+            current = context.stops[best]
+            remaining.discard(best)
+            order.append(best)
+            if index is not None:
+                at_stop[current].remove(best)
+                index.remove(current)
+            while urgent and urgent[0] not in remaining:
+                urgent.pop(0)
+            record_step("nearest-neighbor", len(pool))
+        return order
+
+    def _choose(self, context, pool, urgent, remaining, current, clock):
+        """(closest on-time stop that keeps urgent deadlines reachable, most urgent available stop) in pool."""
+        best = None
+        best_distance = None
+        fallback = None
+        fallback_key = None
+        mpm = context.minutes_per_mile
+        for pos in pool:
+            d = context.dist(current, context.stops[pos])
+            arrival = clock + d * mpm
+            if arrival < context.releases[pos]:
+                continue
+            key = (context.deadlines[pos], d)
+            if fallback is None or key < fallback_key:
+                fallback, fallback_key = pos, key
+            if arrival > context.deadlines[pos] + EPSILON:
+                continue
+            if best_distance is not None and d >= best_distance:
+                continue
+            if self._keeps_deadlines(context, urgent, remaining, pos, arrival):
+                best, best_distance = pos, d
+        return best, fallback
+
+    def _keeps_deadlines(self, context, urgent, remaining, pos, arrival):
+        checked = 0
+        for other in urgent:
+            if checked >= self.lookahead:
+                break
+            if other == pos or other not in remaining:
+                continue
+            checked += 1
+            reach = arrival + context.dist(context.stops[pos], context.stops[other]) * context.minutes_per_mile
+            if reach > context.deadlines[other] + EPSILON:
+                return False
+        return True
+
+class _Improver(RouteStrategy):
+    def __init__(self, max_iterations=1000, time_limit=0.5):
+        self.max_iterations = max_iterations
+        self.time_limit = time_limit  # Seconds, checked before every candidate move
+
+    def apply(self, context, route):
+        route = list(route)
+        best = context.evaluate(route)
+        deadline = time.perf_counter() + self.time_limit
+        iterations = 0
+        improved = True
+        while improved and iterations < self.max_iterations and time.perf_counter() < deadline:
+            improved = False
+            evaluated = 0
+            prefix = context.prefix(route)
+            for delta, first, tail in self._moves(context, route, best[0] > 0):
+                if time.perf_counter() >= deadline:
+                    break
+                evaluated += 1
+                if context.improves(route, first, tail, delta, best, prefix):
+                    route = route[:first] + tail
+                    best = context.evaluate(route)
+                    improved = True
+                    break
+            iterations += 1
+            record_step(self.name, evaluated)
+        return route
+
+    def _moves(self, context, route, any_move):
+        """
+        Yield (delta miles, first changed position, new route from there on) for candidate moves;
+        with any_move False, only those that shorten the route.
+        """
+        raise NotImplementedError
+
+class TwoOpt(_Improver):
+    name = "2-opt"
+
+    def _moves(self, context, route, any_move):
+        n = len(route)
+        for i in range(n - 1):
+            prev = context.node(route, i - 1)
+            first = context.node(route, i)
+            for j in range(i + 1, n):
+                last = context.node(route, j)
+                nxt = context.node(route, j + 1)
+                delta = (context.dist(prev, last) + context.dist(first, nxt)
+                         - context.dist(prev, first) - context.dist(last, nxt))
+                if any_move or delta < -EPSILON:
+                    yield delta, i, route[i:j + 1][::-1] + route[j + 1:]
+
+class OrOpt(_Improver):
+    name = "or-opt"
+
+    def __init__(self, max_segment=3, max_iterations=1000, time_limit=0.5):
+        super().__init__(max_iterations, time_limit)
+        self.max_segment = max_segment
+
+    def _moves(self, context, route, any_move):
+        n = len(route)
+        for length in range(1, self.max_segment + 1):
+            for i in range(n - length + 1):
+                head = context.node(route, i)
+                tail = context.node(route, i + length - 1)
+                prev = context.node(route, i - 1)
+                nxt = context.node(route, i + length)
+                gain = context.dist(prev, head) + context.dist(tail, nxt) - context.dist(prev, nxt)
+                segment = route[i:i + length]
+                rest = route[:i] + route[i + length:]
+                for k in range(len(rest) + 1):
+                    if k == i:
+                        continue
+                    a = context.node(rest, k - 1)
+                    b = context.node(rest, k)
+                    delta = context.dist(a, head) + context.dist(tail, b) - context.dist(a, b) - gain
+                    if any_move or delta < -EPSILON:
+                        # route and rest agree before min(i, k).
+                        first = min(i, k)
+                        yield delta, first, rest[first:k] + segment + rest[k:]
+
+class RouteOptimizer:
+    def __init__(self, strategies=None, scheduler=None):
+        """The default pipeline comes with a DeadlineScheduler; custom strategies only with the one given."""
+        if strategies is None:
+            strategies = [NearestNeighbor(), TwoOpt(), OrOpt()]
+            scheduler = scheduler or DeadlineScheduler()
+        self.strategies = strategies
+        self.scheduler = scheduler
+
+    @property
+    def name(self):
+        names = [s.name for s in self.strategies]
+        if self.scheduler is not None:
+            names.append(self.scheduler.name)
+        return " + ".join(names)
+
+    @profiled()
+    def optimize(self, truck, distances, packages=None, start=None, start_time=None):
+        """
+        Returns (ordered packages, report). The report compares the deadline-only order
+        (before) with the optimized route (after), including the drive back to the hub.
+        By default the truck's whole load is routed from the hub at its current time; pass
+        packages, start (a matrix index) and start_time to re-plan the rest of a route.
+        """
+        packages = list(truck.packages if packages is None else packages)
+        context = RouteContext(truck, packages, distances, start, start_time)
+        baseline = EarliestDeadline().apply(context, range(len(context.packages)))
+        route = baseline
+        for strategy in self.strategies:
+            with stage(strategy.name):
+                route = strategy.apply(context, route)
+        before = context.evaluate(baseline)
+        after = context.evaluate(route)
+        schedule = None
+        if after[0] and self.scheduler is not None:
+            with stage(self.scheduler.name):
+                schedule = self.scheduler.schedule(context)
+            if schedule.feasible:
+                # Shorten the on-time order; improvers never accept a late stop.
+                scheduled = schedule.route
+                for strategy in self.strategies:
+                    if isinstance(strategy, _Improver):
+                        with stage(strategy.name):
+                            scheduled = strategy.apply(context, scheduled)
+                score = context.evaluate(scheduled)
+                if score < after:
+                    route, after = scheduled, score
+        if after > before:
+            route, after = baseline, before
+        reasons = schedule.reasons if schedule is not None and after[0] else []
+        finish = context.finish_time(route)
+        if context.shift_end is not None and finish > context.shift_end + EPSILON:
+            reasons = reasons + [f"Truck {truck.truck_id} gets back to {truck.hub_address} at {_clock(finish)}, "
+                                 f"after its shift ends at {_clock(context.shift_end)}."]
+        report = {
+            "truck_id": truck.truck_id,
+            "strategy": self.name,
+            "stops": len(route),
+            "before_miles": before[1],
+            "after_miles": after[1],
+            "before_violations": before[0],
+            "after_violations": after[0],
+            "schedule": schedule.method if schedule is not None else None,
+            "infeasible_reasons": reasons,
+        }
+        return [context.packages[pos] for pos in route], report
+
+# Named pipelines, so callers (e.g. the scenario runner) can choose a strategy by name.
+PIPELINES = {
+    "earliest-deadline": lambda: [EarliestDeadline()],
+    "nearest-neighbor": lambda: [NearestNeighbor()],
+    "2-opt": lambda: [NearestNeighbor(), TwoOpt()],
+    "full": lambda: [NearestNeighbor(), TwoOpt(), OrOpt()],
+    # Mid-day re-planning of a few remaining stops, where answers are needed in milliseconds.
+    "replan": lambda: [NearestNeighbor(), TwoOpt(max_iterations=200, time_limit=0.01),
+                       OrOpt(max_iterations=200, time_limit=0.01)],
+}
+
+# Pipelines kept to show what a single heuristic does on its own, so they run without the scheduler.
+HEURISTIC_ONLY = ("earliest-deadline", "nearest-neighbor")
+# DeadlineScheduler settings for pipelines that cannot afford its default search budget.
+SCHEDULER_SETTINGS = {
+    "replan": {"node_limit": 2000, "time_limit": 0.01},
+}
+
+def make_optimizer(pipeline="full"):
+    if pipeline not in PIPELINES:
+        raise ValueError(f"Unknown route pipeline '{pipeline}'. Choose from: {', '.join(PIPELINES)}.")
+    if pipeline in HEURISTIC_ONLY:
+        return RouteOptimizer(PIPELINES[pipeline](), None)
+    return RouteOptimizer(PIPELINES[pipeline](), DeadlineScheduler(**SCHEDULER_SETTINGS.get(pipeline, {})))
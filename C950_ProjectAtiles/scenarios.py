@@ -0,0 +1,144 @@
+# scenarios.py
+"""
+Scenario Runner
+Simulates many independent what-if plans (departure times, truck and driver counts, speeds and
+route pipelines) on the event engine in a process pool, so trucks make as many trips as the day
+needs, and ranks them by deadline misses, then total mileage. A scenario that fails reports its
+error in its result row; workers print nothing.
+The distance matrix is copied once into shared memory; each worker attaches to it and
+receives the manifest once in its initializer, so tasks only carry the small Scenario.
+Run this file directly to compare the default scenario grid for the sample manifest.
+"""
+
+import copy
+import multiprocessing
+from datetime import timedelta
+from multiprocessing import shared_memory
+from distance_matrix import DistanceMatrix
+from driver import Driver
+from event_engine import EventEngine
+from load_planner import ADDRESS_CORRECTIONS
+from route_optimizer import make_optimizer
+from truck import Truck
+from user_interface import convert_delta_to_time_str
+
+class Scenario:
+    def __init__(self, name, departure_times, speed=18, pipeline="full", capacity=16, drivers=None):
+        self.name = name
+        self.departure_times = list(departure_times)  # One timedelta from 8:00 AM per truck
+        self.speed = speed
+        self.pipeline = pipeline
+        self.capacity = capacity
+        self.drivers = len(self.departure_times) if drivers is None else drivers
+
+    def build_trucks(self):
+        """The scenario's trucks, the first `drivers` of them with a driver."""
+        trucks = [Truck(i, departure_time=departure, speed=self.speed, capacity=self.capacity)
+                  for i, departure in enumerate(self.departure_times, start=1)]
+        for i in range(1, self.drivers + 1):
+            Driver(i).assign_truck(trucks)
+        return trucks
+
+# Worker state, set once per process by _init_worker.
+_distances = None
+_packages = None
+_shared_block = None
+
+def _init_worker(block_name, addresses, packages):
+    global _distances, _packages, _shared_block
+    _shared_block = shared_memory.SharedMemory(name=block_name)
+    size = len(addresses)
+    data = _shared_block.buf[:size * size * 8].cast('d')
+    _distances = DistanceMatrix(addresses, data)
+    _packages = packages
+
+def simulate_scenario(scenario, packages=None, distances=None):
+    """Simulate one scenario's day on fresh copies of the packages; returns a summary dict."""
+    packages = copy.deepcopy(packages if packages is not None else _packages)
+    distances = distances if distances is not None else _distances
+    result = {
+        "scenario": scenario.name,
+        "trucks": len(scenario.departure_times),
+        "drivers": scenario.drivers,
+        "departures": [convert_delta_to_time_str(t) for t in scenario.departure_times],
+        "speed": scenario.speed,
+        "pipeline": scenario.pipeline,
+        "total_miles": None,
+        "deadline_misses": None,
+        "late_packages": [],
+        "infeasible_reasons": [],
+        "error": None,
+    }
+    trucks = scenario.build_trucks()
+    try:
+        engine = EventEngine(distances, make_optimizer(scenario.pipeline))
+        engine.setup(packages, trucks, ADDRESS_CORRECTIONS)
+        engine.run()
+    except Exception as e:
+        # One broken scenario must not take down the whole comparison.
+        result["error"] = str(e) if isinstance(e, ValueError) else f"{type(e).__name__}: {e}"
+        return result
+    late = [pkg.package_id for pkg in packages
+            if pkg.delivery_time is None or pkg.is_late()]
+    result["total_miles"] = round(sum(truck.mileage for truck in trucks), 2)
+    result["deadline_misses"] = len(late)
+    result["late_packages"] = late
+    result["infeasible_reasons"] = [reason for truck in trucks for report in truck.trip_reports
+                                    for reason in report["infeasible_reasons"]]
+    return result
+
+def rank_results(results):
+    """Feasible plans first, then fewest deadline misses, then fewest miles."""
+    return sorted(results, key=lambda r: (r["error"] is not None, r["deadline_misses"] or 0, r["total_miles"] or 0.0))
+
+def run_scenarios(packages, distances, scenarios, processes=None):
+    """
+    Simulates every scenario in a process pool (one worker per core by default) and
+    returns the ranked summaries. The packages must not have been simulated yet.
+    """
+    size = distances.size
+    block = shared_memory.SharedMemory(create=True, size=max(size * size * 8, 1))
+    try:
+        shared = block.buf[:size * size * 8].cast('d')
+        shared[:] = distances.data
+        shared.release()
+        with multiprocessing.Pool(processes, initializer=_init_worker,
+                                  initargs=(block.name, distances.addresses, packages)) as pool:
+            results = pool.map(simulate_scenario, scenarios, chunksize=1)
+    finally:
+        block.close()
+        block.unlink()
+    return rank_results(results)
+
+def default_scenarios():
+    """A grid of departure plans, fleet sizes, speeds and route pipelines to compare."""
+    scenarios = []
+    plans = {
+        "2 trucks": [timedelta(0), timedelta(minutes=65)],
+        "3 trucks": [timedelta(0), timedelta(minutes=65), timedelta(0)],
+        "3 trucks, late third": [timedelta(0), timedelta(minutes=65), timedelta(hours=2, minutes=20)],
+        "4 trucks": [timedelta(0), timedelta(minutes=65), timedelta(0), timedelta(minutes=65)],
+    }
+    for plan_name, departures in plans.items():
+        for speed in (18, 25):
+            for pipeline in ("earliest-deadline", "nearest-neighbor", "full"):
+                scenarios.append(Scenario(f"{plan_name} @ {speed} mph, {pipeline}", departures, speed, pipeline))
+    return scenarios
+
+def show_scenario_summary(results):
+    print("\nRank | Misses | Miles    | Scenario")
+    print("---------------------------------------------------------------------")
+    for rank, r in enumerate(results, start=1):
+        if r["error"]:
+            print(f"{rank:>4} |    --- |      --- | {r['scenario']} ({r['error']})")
+        else:
+            print(f"{rank:>4} | {r['deadline_misses']:>6} | {r['total_miles']:>8.2f} | {r['scenario']}")
+
+if __name__ == "__main__":
+    from hash_table import HashTable
+    from main import load_address_data, load_packages_into_hash
+    distances = load_address_data("distances.csv")
+    package_hash = HashTable()
+    load_packages_into_hash("packages.csv", package_hash, distances)
+    packages = sorted(package_hash.values(), key=lambda pkg: pkg.package_id)
+    show_scenario_summary(run_scenarios(packages, distances, default_scenarios()))
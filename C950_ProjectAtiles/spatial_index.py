@@ -0,0 +1,262 @@
+# spatial_index.py
+"""
+Spatial Index
+'distances.csv' has no coordinates, so stops are embedded into the plane with landmark
+classical MDS: a few far-apart landmark stops are placed by classical MDS (double-centred squared
+distances, top eigenvectors by power iteration) and every other stop is positioned from its
+distances to them. With as many landmarks as stops this is plain classical MDS. Imported
+coordinates (e.g. projected lat/lon) can be used instead.
+A uniform grid over the points (about two per cell) answers k-nearest queries by searching
+rings of cells outward from the query, and radius queries from the covering cells; stops are
+inserted and removed as they are loaded and served. Road distances are not exactly Euclidean,
+so queries over a DistanceMatrix pull extra candidates from the grid and check them against the
+real matrix distance: nearest() re-ranks a few more than it needs, and within() widens its
+radius by the embedding's largest measured error, so it misses nothing.
+"""
+
+import heapq
+import math
+from array import array
+
+def coordinates_of(distances, landmarks=64):
+    """
+    Planar coordinates for every stop of a DistanceMatrix, embedded once and kept on it.
+    Assign distances.coordinates first to use imported coordinates instead of the embedding.
+    """
+    if distances.coordinates is None:
+        distances.coordinates = classical_mds(distances, landmarks=landmarks)
+    return distances.coordinates
+
+def grid_of(distances):
+    """The Grid over a DistanceMatrix's embedded stops, built once and kept on it."""
+    if distances.spatial_grid is None:
+        distances.spatial_grid = Grid(coordinates_of(distances))
+    return distances.spatial_grid
+
+#  Embedding
+
+def classical_mds(distances, dimensions=2, landmarks=64):
+    """Landmark classical MDS: a list of `dimensions`-tuples, one per matrix index."""
+    n = distances.size
+    if n == 0:
+        return []
+    picks = _farthest_points(distances, min(n, landmarks))
+    count = len(picks)
+    squared = [[distances.between(a, b) ** 2 for b in picks] for a in picks]
+    means = [sum(row) / count for row in squared]
+    grand = sum(means) / count
+    centred = [[-0.5 * (squared[i][j] - means[i] - means[j] + grand) for j in range(count)] for i in range(count)]
+    axes = [(value, vector) for value, vector in _top_eigenpairs(centred, dimensions) if value > 1e-9]
+    coordinates = []
+    for a in range(n):
+        delta = [distances.between(a, b) ** 2 - means[k] for k, b in enumerate(picks)]
+        point = [-0.5 * sum(v * d for v, d in zip(vector, delta)) / math.sqrt(value) for value, vector in axes]
+        point.extend([0.0] * (dimensions - len(point)))
+        coordinates.append(tuple(point))
+    return coordinates
+
+def _farthest_points(distances, count):
+    """Landmarks by farthest-point sampling, starting at the hub."""
+    picks = [0]
+    nearest = list(distances.row(0))
+    while len(picks) < count:
+        best = max(range(distances.size), key=nearest.__getitem__)
+        if nearest[best] <= 0.0:
+            break  # Only duplicates of chosen landmarks remain
+        picks.append(best)
+        row = distances.row(best)
+        for i in range(distances.size):
+            if row[i] < nearest[i]:
+                nearest[i] = row[i]
+    return picks
+
+def _top_eigenpairs(matrix, count, iterations=300):
+    """Largest eigenpairs of a symmetric matrix by shifted power iteration with deflation."""
+    n = len(matrix)
+    shift = max(sum(abs(x) for x in row) for row in matrix)  # Makes every eigenvalue non-negative
+    found = []
+    for k in range(min(count, n)):
+        vector = [1.0 / math.sqrt(n) * (1 + (i * (k + 1)) % 7) for i in range(n)]
+        for _ in range(iterations):
+            product = [sum(m * v for m, v in zip(row, vector)) + shift * vector[i] for i, row in enumerate(matrix)]
+            for _, other in found:
+                dot = sum(p * o for p, o in zip(product, other))
+                product = [p - dot * o for p, o in zip(product, other)]
+            norm = math.sqrt(sum(p * p for p in product))
+            if norm == 0.0:
+                break
+            product = [p / norm for p in product]
+            converged = sum(abs(p - v) for p, v in zip(product, vector)) < 1e-10
+            vector = product
+            if converged:
+                break
+        value = sum(v * sum(m * w for m, w in zip(row, vector)) for v, row in zip(vector, matrix))
+        found.append((value, vector))
+    return found
+
+def embedding_error(distances, points):
+    """
+    How far planar distances overshoot matrix distances at worst: max(planar - matrix) over
+    every pair of stops, never below zero. Within this margin a matrix radius is a planar one.
+    """
+    worst = 0.0
+    for a in range(distances.size):
+        row = distances.row(a)
+        here = points[a]
+        for b in range(distances.size):
+            over = math.dist(here, points[b]) - row[b]
+            if over > worst:
+                worst = over
+    return worst
+
+#  Index
+
+class Grid:
+    """A uniform grid over 2-d points (tuples), sized for about two points per cell."""
+    def __init__(self, points, per_cell=2.0):
+        self.points = points
+        xs = [p[0] for p in points] or [0.0]
+        ys = [p[1] for p in points] or [0.0]
+        self.min_x, self.min_y = min(xs), min(ys)
+        area = max((max(xs) - self.min_x) * (max(ys) - self.min_y), 1e-9)
+        self.cell = max(math.sqrt(area * per_cell / max(len(points), 1)), 1e-9)
+        self.columns = int((max(xs) - self.min_x) / self.cell) + 1
+        self.rows = int((max(ys) - self.min_y) / self.cell) + 1
+        self.cell_of = array('i', (self.key(p) for p in points))
+        self.error = None  # Largest planar minus matrix distance, see embedding_error
+
+    def coords(self, point):
+        """(column, row) of the cell containing a point, clamped to the grid."""
+        cx = min(max(int((point[0] - self.min_x) / self.cell), 0), self.columns - 1)
+        cy = min(max(int((point[1] - self.min_y) / self.cell), 0), self.rows - 1)
+        return cx, cy
+
+    def key(self, point):
+        cx, cy = self.coords(point)
+        return cx * self.rows + cy
+
+class SpatialIndex:
+    """
+    The live subset of a Grid's points, with a count per point (e.g. packages at a stop).
+    Points start absent; insert() and remove() move them in and out of their cells.
+    """
+    def __init__(self, grid, distances=None, oversample=2):
+        self.grid = grid
+        self.distances = distances  # When given, nearest() re-ranks by real matrix distance
+        self.oversample = oversample
+        self.counts = array('i', [0]) * len(grid.points)
+        self.cells = {}  # Cell key -> set of live points in it
+        self.members = set()  # All live points
+
+    @classmethod
+    def for_distances(cls, distances, stops=()):
+        index = cls(grid_of(distances), distances)
+        for stop in stops:
+            index.insert(stop)
+        return index
+
+    def insert(self, point, count=1):
+        if self.counts[point] == 0:
+            self.members.add(point)
+            self.cells.setdefault(self.grid.cell_of[point], set()).add(point)
+        self.counts[point] += count
+
+    def remove(self, point, count=1):
+        if self.counts[point] < count:
+            raise ValueError(f"Stop {point} is not in the index {count} time(s).")
+        self.counts[point] -= count
+        if self.counts[point] == 0:
+            self.members.discard(point)
+            cell = self.cells[self.grid.cell_of[point]]
+            cell.discard(point)
+            if not cell:
+                del self.cells[self.grid.cell_of[point]]
+
+    def __contains__(self, point):
+        return self.counts[point] > 0
+
+    def __len__(self):
+        return len(self.members)
+
+    #  Queries (origin is a point index; it may itself be live)
+
+    def nearest(self, origin, k=1):
+        """
+        Up to k live points closest to origin. Over a DistanceMatrix, k * oversample points
+        nearest in the plane are re-ranked by matrix distance.
+        """
+        if self.distances is None:
+            return [point for _, point in self._knn(self.grid.points[origin], k)]
+        found = self._knn(self.grid.points[origin], k * self.oversample)
+        row = self.distances.row(origin)
+        return sorted((point for _, point in found), key=row.__getitem__)[:k]
+
+    def within(self, origin, radius):
+        """
+        Live points whose distance from origin is at most radius. Over a DistanceMatrix the
+        plane is searched out to radius plus the embedding error (measured on the first call)
+        and the result filtered by matrix distance, so no point within radius is missed.
+        """
+        if self.distances is None:
+            return self._radius(self.grid.points[origin], radius)
+        if self.grid.error is None:
+            self.grid.error = embedding_error(self.distances, self.grid.points)
+        row = self.distances.row(origin)
+        reach = radius + self.grid.error
+        return [point for point in self._radius(self.grid.points[origin], reach) if row[point] <= radius]
+
+    def _knn(self, target, k):
+        """[(planar distance, point)] for the k nearest live points, closest first."""
+        points = self.grid.points
+        if k <= 0 or not self.members:
+            return []
+        if len(self.members) <= 4 * k:
+            # Few points left: a scan beats walking rings of mostly empty cells.
+            return sorted((math.dist(points[p], target), p) for p in self.members)[:k]
+        grid = self.grid
+        cx, cy = grid.coords(target)
+        best = []  # Max-heap of (-distance, point)
+        reach = max(cx, grid.columns - 1 - cx, cy, grid.rows - 1 - cy)
+        for ring in range(reach + 1):
+            for key in self._ring(cx, cy, ring):
+                cell = self.cells.get(key)
+                if not cell:
+                    continue
+                for point in cell:
+                    d = math.dist(points[point], target)
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, point))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, point))
+            # Every point in a later ring is at least `ring` whole cells away.
+            if len(best) == k and -best[0][0] <= ring * grid.cell:
+                break
+        return sorted((-negative, point) for negative, point in best)
+
+    def _ring(self, cx, cy, ring):
+        """Keys of the cells exactly `ring` cells from (cx, cy) in Chebyshev distance."""
+        grid = self.grid
+        if ring == 0:
+            yield cx * grid.rows + cy
+            return
+        for x in range(max(cx - ring, 0), min(cx + ring, grid.columns - 1) + 1):
+            for y in (cy - ring, cy + ring):
+                if 0 <= y < grid.rows:
+                    yield x * grid.rows + y
+        for y in range(max(cy - ring + 1, 0), min(cy + ring - 1, grid.rows - 1) + 1):
+            for x in (cx - ring, cx + ring):
+                if 0 <= x < grid.columns:
+                    yield x * grid.rows + y
+
+    def _radius(self, target, radius):
+        grid = self.grid
+        points = grid.points
+        low_x, low_y = grid.coords((target[0] - radius, target[1] - radius))
+        high_x, high_y = grid.coords((target[0] + radius, target[1] + radius))
+        found = []
+        for x in range(low_x, high_x + 1):
+            for y in range(low_y, high_y + 1):
+                for point in self.cells.get(x * grid.rows + y, ()):
+                    if math.dist(points[point], target) <= radius:
+                        found.append(point)
+        return found
@@ -0,0 +1,298 @@
+# timeline.py
+"""
+Timeline
+An event-sourced record of a finished simulation: departures, deliveries, address corrections,
+cancellations and returns to the hub, kept sorted in flat arrays (times in seconds after 8:00 AM).
+Point queries -- the state of a package, a truck's mileage or location, or the fleet's total
+mileage at time T -- are answered by bisection instead of rescanning logs.
+sweep() replays the log once to export every package's state for a whole list of query times.
+"""
+
+from array import array
+from bisect import bisect_right
+from datetime import timedelta
+
+DEPART, LOAD, DELIVER, CORRECT, RETURN, CANCEL = 0, 1, 2, 3, 4, 5
+EVENT_NAMES = ("Departed", "Left Hub", "Delivered", "Address Corrected", "Returned to Hub", "Cancelled")
+
+def _seconds(delta):
+    return delta.total_seconds()
+
+class _PackageTrack:
+    def __init__(self, package_id, address):
+        self.package_id = package_id
+        self.truck_id = None
+        self.depart = None  # Seconds; None while the package never leaves the hub
+        self.delivered = None
+        self.delivery_time = None  # The same instant as a timedelta, for reporting
+        self.cancelled = None  # Seconds; None unless the package was withdrawn
+        self.address_times = array('d', [float('-inf')])
+        self.addresses = [address]
+
+class _TruckTrack:
+    def __init__(self, truck_id):
+        self.truck_id = truck_id
+        self.times = array('d')
+        self.mileage = array('d')
+        self.locations = []
+
+class Timeline:
+    def __init__(self):
+        self.times = array('d')
+        self.kinds = array('b')
+        self.truck_ids = array('i')
+        self.package_ids = array('i')  # 0 for truck-only events
+        self.package_order = []  # Package IDs in report order
+        self._packages = {}
+        self._trucks = {}
+        self._fleet_times = array('d')
+        self._fleet_mileage = array('d')  # Cumulative fleet miles after each truck event
+
+    @classmethod
+    def from_simulation(cls, packages, truck_list, corrections=(), cancellations=()):
+        """
+        Builds the timeline from simulated packages and trucks. corrections is an iterable of
+        (package_id, time, new_address) and cancellations of (package_id, time): the changes the
+        simulation applied (EventEngine.corrections and .cancellations). A correction changes the
+        reported address from its time on; a cancelled package reports "Cancelled".
+        """
+        timeline = cls()
+        events = []
+        loaded = []
+        for pkg in packages:
+            track = _PackageTrack(pkg.package_id, pkg.original_address or pkg.address)
+            timeline._packages[pkg.package_id] = track
+            timeline.package_order.append(pkg.package_id)
+            if pkg.delivery_time is not None:
+                track.truck_id = pkg.truck_id
+                track.delivered = _seconds(pkg.delivery_time)
+                track.delivery_time = pkg.delivery_time
+                events.append((track.delivered, DELIVER, pkg.truck_id, pkg.package_id))
+                if pkg.loaded_time is not None:
+                    track.depart = _seconds(pkg.loaded_time)
+                else:
+                    loaded.append(track)
+            elif pkg.loaded_time is not None:
+                # Loaded but never delivered, e.g. cancelled while on the truck.
+                track.truck_id = pkg.truck_id
+                track.depart = _seconds(pkg.loaded_time)
+        timeline.package_order.sort()
+        for pid, when, address in sorted(corrections, key=lambda c: c[1]):
+            track = timeline._packages.get(pid)
+            if track is None:
+                continue
+            track.address_times.append(_seconds(when))
+            track.addresses.append(address)
+            events.append((_seconds(when), CORRECT, 0, pid))
+        for pid, when in cancellations:
+            track = timeline._packages.get(pid)
+            if track is None:
+                continue
+            track.cancelled = _seconds(when)
+            events.append((track.cancelled, CANCEL, 0, pid))
+        departures = {}
+        fleet = []
+        for truck in truck_list:
+            ttrack = _TruckTrack(truck.truck_id)
+            timeline._trucks[truck.truck_id] = ttrack
+            depart = _seconds(truck.departure_time)
+            departures[truck.truck_id] = depart
+            for start in truck.trip_starts or [truck.departure_time]:
+                events.append((_seconds(start), DEPART, truck.truck_id, 0))
+            ttrack.times.append(depart)
+            ttrack.mileage.append(0.0)
+            ttrack.locations.append(truck.hub_address)
+            log = truck.delivery_log
+            ttrack.times.extend(log.times)
+            ttrack.mileage.extend(log.mileage)
+            ttrack.locations.extend(log.locations)
+            previous = 0.0
+            for when, miles in zip(log.times, log.mileage):
+                fleet.append((when, miles - previous))
+                previous = miles
+            if len(log):
+                events.append((log.times[-1], RETURN, truck.truck_id, 0))
+        # Packages simulated without the event engine left the hub with their truck's first departure.
+        for track in loaded:
+            if track.truck_id in departures:
+                track.depart = departures[track.truck_id]
+        for track in timeline._packages.values():
+            if track.depart is not None:
+                events.append((track.depart, LOAD, track.truck_id, track.package_id))
+        events.sort()
+        for when, kind, truck_id, pid in events:
+            timeline.times.append(when)
+            timeline.kinds.append(kind)
+            timeline.truck_ids.append(truck_id)
+            timeline.package_ids.append(pid)
+        fleet.sort()
+        total = 0.0
+        for when, miles in fleet:
+            total += miles
+            timeline._fleet_times.append(when)
+            timeline._fleet_mileage.append(total)
+        return timeline
+
+    #  Serialization (used by the on-disk plan cache)
+
+    def to_columns(self):
+        """
+        Flattens the timeline into (columns, strings): columns maps names to array.array objects,
+        strings holds the address and location text. from_columns() reverses it.
+        """
+        nan = float('nan')
+        tracks = [self._packages[pid] for pid in self.package_order]
+        trucks = [self._trucks[tid] for tid in self.truck_ids_in_order()]
+        columns = {
+            "times": self.times,
+            "kinds": self.kinds,
+            "truck_ids": self.truck_ids,
+            "package_ids": self.package_ids,
+            "fleet_times": self._fleet_times,
+            "fleet_mileage": self._fleet_mileage,
+            "pkg_ids": array('i', (t.package_id for t in tracks)),
+            "pkg_trucks": array('i', (t.truck_id or 0 for t in tracks)),
+            "pkg_depart": array('d', (nan if t.depart is None else t.depart for t in tracks)),
+            "pkg_delivered": array('d', (nan if t.delivered is None else t.delivered for t in tracks)),
+            "pkg_cancelled": array('d', (nan if t.cancelled is None else t.cancelled for t in tracks)),
+            "pkg_address_counts": array('i', (len(t.addresses) for t in tracks)),
+            "pkg_address_times": array('d', (when for t in tracks for when in t.address_times)),
+            "truck_track_ids": array('i', (t.truck_id for t in trucks)),
+            "truck_counts": array('i', (len(t.times) for t in trucks)),
+            "truck_times": array('d', (when for t in trucks for when in t.times)),
+            "truck_mileage": array('d', (miles for t in trucks for miles in t.mileage)),
+        }
+        strings = {
+            "addresses": [t.addresses for t in tracks],
+            "locations": [t.locations for t in trucks],
+        }
+        return columns, strings
+
+    @classmethod
+    def from_columns(cls, columns, strings):
+        """Rebuild a timeline from to_columns() output; the columns may be memoryviews."""
+        timeline = cls()
+        timeline.times = columns["times"]
+        timeline.kinds = columns["kinds"]
+        timeline.truck_ids = columns["truck_ids"]
+        timeline.package_ids = columns["package_ids"]
+        timeline._fleet_times = columns["fleet_times"]
+        timeline._fleet_mileage = columns["fleet_mileage"]
+        start = 0
+        for i, pid in enumerate(columns["pkg_ids"]):
+            addresses = strings["addresses"][i]
+            track = _PackageTrack(pid, addresses[0])
+            track.truck_id = columns["pkg_trucks"][i] or None
+            depart = columns["pkg_depart"][i]
+            delivered = columns["pkg_delivered"][i]
+            cancelled = columns["pkg_cancelled"][i]
+            track.depart = None if depart != depart else depart  # NaN marks "never"
+            track.cancelled = None if cancelled != cancelled else cancelled
+            if delivered == delivered:
+                track.delivered = delivered
+                track.delivery_time = timedelta(seconds=delivered)
+            end = start + columns["pkg_address_counts"][i]
+            track.address_times = columns["pkg_address_times"][start:end]
+            track.addresses = addresses
+            start = end
+            timeline._packages[pid] = track
+            timeline.package_order.append(pid)
+        start = 0
+        for i, truck_id in enumerate(columns["truck_track_ids"]):
+            ttrack = _TruckTrack(truck_id)
+            end = start + columns["truck_counts"][i]
+            ttrack.times = columns["truck_times"][start:end]
+            ttrack.mileage = columns["truck_mileage"][start:end]
+            ttrack.locations = strings["locations"][i]
+            start = end
+            timeline._trucks[truck_id] = ttrack
+        return timeline
+
+    #  Point queries (at is a timedelta from 8:00 AM)
+
+    def package_state(self, package_id, at):
+        track = self._packages.get(package_id)
+        if track is None:
+            return None
+        return self._state(track, _seconds(at))
+
+    def _state(self, track, t):
+        if track.delivered is not None and track.delivered <= t:
+            status = "Delivered"
+        elif track.cancelled is not None and track.cancelled <= t:
+            status = "Cancelled"
+        elif track.depart is not None and track.depart <= t:
+            status = "En Route"
+        else:
+            status = "At Hub"
+        address = track.addresses[bisect_right(track.address_times, t) - 1]
+        return {
+            "package_id": track.package_id,
+            "status": status,
+            "address": address,
+            "delivery_time": track.delivery_time if status == "Delivered" else None,
+            "truck_id": track.truck_id if status in ("En Route", "Delivered") else None,
+        }
+
+    def truck_mileage(self, truck_id, at):
+        track = self._trucks[truck_id]
+        i = bisect_right(track.times, _seconds(at)) - 1
+        return track.mileage[i] if i >= 0 else 0.0
+
+    def truck_location(self, truck_id, at):
+        """Last stop the truck reached at or before the given time (its depot before it departs)."""
+        track = self._trucks[truck_id]
+        i = bisect_right(track.times, _seconds(at)) - 1
+        return track.locations[i] if i >= 0 else track.locations[0]
+
+    def fleet_mileage(self, at):
+        i = bisect_right(self._fleet_times, _seconds(at)) - 1
+        return self._fleet_mileage[i] if i >= 0 else 0.0
+
+    def truck_ids_in_order(self):
+        return sorted(self._trucks)
+
+    def events_until(self, at):
+        """All (seconds, event name, truck ID, package ID) events up to the given time."""
+        end = bisect_right(self.times, _seconds(at))
+        return [(self.times[i], EVENT_NAMES[self.kinds[i]], self.truck_ids[i], self.package_ids[i])
+                for i in range(end)]
+
+    #  Bulk export
+
+    def sweep(self, query_times):
+        """
+        Yields (time, states) for every query time in ascending order, where states lists each
+        package's state in package_order. The event log is replayed once across all times.
+        """
+        order = {pid: i for i, pid in enumerate(self.package_order)}
+        tracks = [self._packages[pid] for pid in self.package_order]
+        status = ["At Hub"] * len(tracks)
+        address_slot = [0] * len(tracks)
+        cursor = 0
+        for at in sorted(query_times):
+            t = _seconds(at)
+            while cursor < len(self.times) and self.times[cursor] <= t:
+                kind = self.kinds[cursor]
+                if kind == LOAD:
+                    i = order[self.package_ids[cursor]]
+                    if status[i] == "At Hub":
+                        status[i] = "En Route"
+                elif kind == DELIVER:
+                    status[order[self.package_ids[cursor]]] = "Delivered"
+                elif kind == CORRECT:
+                    address_slot[order[self.package_ids[cursor]]] += 1
+                elif kind == CANCEL:
+                    status[order[self.package_ids[cursor]]] = "Cancelled"
+                cursor += 1
+            states = []
+            for i, track in enumerate(tracks):
+                s = status[i]
+                states.append({
+                    "package_id": track.package_id,
+                    "status": s,
+                    "address": track.addresses[address_slot[i]],
+                    "delivery_time": track.delivery_time if s == "Delivered" else None,
+                    "truck_id": track.truck_id if s in ("En Route", "Delivered") else None,
+                })
+            yield at, states
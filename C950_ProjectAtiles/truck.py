@@ -5,42 +5,70 @@ Truck
 Defines the Truck class used to simulate the delivery trucks.
 Each truck has:
   - A unique truck ID.
-  - A departure time (as a timedelta from 8:00 AM).
-  - A maximum capacity of 16 packages.
+  - A departure time (as a timedelta from 8:00 AM) and an optional end of shift.
+  - A capacity in packages (16 by default) and an optional weight limit in kg.
+  - A depot (distance matrix row) where its trips start and end; row 0 is the main hub.
   - A current location and mileage tracker.
   - A driver (assigned from driver.py).
   - Methods for loading packages, delivering packages, and returning to the hub.
 """
 
 from datetime import timedelta
+from delivery_log import DeliveryLog
 
 class Truck:
-    def __init__(self, truck_id, departure_time, speed=18):
+    def __init__(self, truck_id, departure_time, speed=18, capacity=16, max_weight=None, depot_index=0, depot="Hub",
+                 shift_end=None):
         self.truck_id = truck_id
         self.departure_time = departure_time  # For example, timedelta(minutes=0) for 8:00 AM
+        self.shift_start = departure_time  # The truck cannot leave before its shift starts
+        self.shift_end = shift_end  # Latest return to the depot (timedelta from 8:00 AM), or None
         self.speed_mph = speed
+        self.capacity = capacity  # Maximum number of packages
+        self.max_weight = max_weight  # Maximum load in kg (Package.weight_kg), or None for no limit
         self.packages = []  # List of Package objects loaded onto the truck
         self.mileage = 0.0  # Total miles traveled
         self.current_time = departure_time  # Updated as deliveries occur
-        self.current_location = "Hub"  # Starting location
-        self.hub_address = "Hub"  # For distance lookups, "Hub" is replaced by the first address in distances.csv
-        self.delivery_log = []  # Records snapshots for reporting
+        self.current_location = depot  # Starting location
+        self.hub_address = depot  # Name of the truck's depot; "Hub" is the first address in distances.csv
+        self.hub_index = depot_index  # Distance matrix row of the truck's depot (the main hub is row 0)
+        self.current_index = depot_index  # Distance matrix row of the truck's current location
+        self.delivery_log = DeliveryLog()  # Columnar record of every stop for reporting
+        self._pending_loads = []  # Package IDs loaded since the last logged event
         self.driver = None  # To be assigned via driver.py
+        self.route_report = None  # Before/after mileage from the route optimizer
+        self.trip_reports = []  # One route report per trip when the event engine runs the truck
+        self.trip_starts = []  # Hub departure time of every trip
 
     def is_full(self):
-        """Returns True if the truck has reached its maximum capacity (16 packages)."""
-        return len(self.packages) >= 16
+        """Returns True if the truck has reached its package capacity."""
+        return len(self.packages) >= self.capacity
+
+    def load_weight(self):
+        return sum(pkg.weight_kg for pkg in self.packages)
+
+    def can_carry(self, packages, count=0, weight=0.0):
+        """True if the packages fit on top of a load of `count` packages weighing `weight` kg."""
+        if count + len(packages) > self.capacity:
+            return False
+        return self.max_weight is None or weight + sum(pkg.weight_kg for pkg in packages) <= self.max_weight
+
+    def on_shift(self, at):
+        """True if the truck may leave its depot at the given time."""
+        return self.shift_start <= at and (self.shift_end is None or at < self.shift_end)
 
     def load_package(self, package):
         """
-        Loads a package onto the truck if capacity allows.
+        Loads a package onto the truck if its package and weight capacity allow.
         Marks the package as assigned to this truck.
         """
-        if not self.is_full():
-            self.packages.append(package)
-            package.assigned_truck_id = self.truck_id
-        else:
+        if self.is_full():
             raise Exception(f"Truck {self.truck_id} is full.")
+        if self.max_weight is not None and self.load_weight() + package.weight_kg > self.max_weight:
+            raise Exception(f"Truck {self.truck_id} cannot carry {package.weight_kg:g} kg more.")
+        self.packages.append(package)
+        package.assigned_truck = self.truck_id
+        self._pending_loads.append(package.package_id)
 
     def deliver_package(self, pkg, distance):
         """
@@ -56,30 +84,31 @@ class Truck:
         self.current_location = pkg.address
         pkg.status = "Delivered"
         pkg.delivery_time = self.current_time
-        self.record_event()
+        self.record_event(pkg.package_id)
 
     def send_back_to_hub(self, distance):
         """
-        Simulates the truck returning to the hub:
+        Simulates the truck returning to its depot:
           - Updates mileage and current time.
-          - Sets the current location to "Hub".
+          - Sets the current location to the depot.
           - Logs the event.
         """
+        self.drive_to(self.hub_address, distance)
+
+    def drive_to(self, location, distance):
+        """Drives to a location without delivering there (e.g. a stop whose package was cancelled) and logs it."""
         self.mileage += distance
         travel_minutes = (distance / self.speed_mph) * 60.0
         self.current_time += timedelta(minutes=travel_minutes)
-        self.current_location = "Hub"
+        self.current_location = location
         self.record_event()
 
-    def record_event(self):
+    def record_event(self, delivered_id=0):
         """
-        Records a snapshot of the truck's state for reporting:
-          - Current time, location, mileage, and the list of remaining package IDs.
+        Records the truck's state for reporting:
+          - Current time, location, mileage, the package delivered (if any) and any packages
+            loaded since the previous event. Remaining package IDs are rebuilt from these deltas.
         """
-        snapshot = {
-            "time": self.current_time,
-            "location": self.current_location,
-            "mileage": self.mileage,
-            "undelivered": [p.package_id for p in self.packages],
-        }
-        self.delivery_log.append(snapshot)
+        self.delivery_log.record(self.current_time, self.current_location, self.mileage,
+                                 delivered_id, self._pending_loads)
+        self._pending_loads.clear()
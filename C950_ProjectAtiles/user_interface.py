@@ -1,11 +1,44 @@
 # user_interface.py
 """
 User Interface
-Provides a helper function to convert a timedelta (from 8:00 AM) into a formatted time string.
+Provides helper functions to convert between times of day and timedeltas from 8:00 AM.
 """
 
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import lru_cache
 
 def convert_delta_to_time_str(delta):
+    """'HH:MM AM/PM' for a timedelta from 8:00 AM. Seconds are dropped, so results are cached per minute."""
+    return _minute_to_time_str(int(delta.total_seconds() // 60))
+
+@lru_cache(maxsize=4096)
+def _minute_to_time_str(minute):
     base = datetime(2020, 1, 1, 8, 0)
-    return (base + delta).strftime("%I:%M %p")
+    return (base + timedelta(minutes=minute)).strftime("%I:%M %p")
+
+@lru_cache(maxsize=4096)
+def deadline_to_timedelta(deadline_str):
+    """Convert a deadline string (e.g. '10:30 AM' or 'EOD') into a timedelta from 8:00 AM.
+       Here 'EOD' is interpreted as 5:00 PM (i.e. 9 hours after 8:00 AM).
+       Results are cached: a manifest only has a handful of distinct deadlines."""
+    if deadline_str.strip().upper() == "EOD":
+        return timedelta(hours=9)
+    else:
+        dt = datetime.strptime(deadline_str, "%I:%M %p")
+        base = datetime(2020, 1, 1, 8, 0)
+        return datetime(2020, 1, 1, dt.hour, dt.minute) - base
+
+def parse_report_time(text):
+    """
+    Convert a time of day ('10:30 AM' or 24-hour '14:05') into a timedelta from 8:00 AM.
+    Times before 8:00 AM become 0. Raises ValueError for anything else.
+    """
+    text = text.strip()
+    for fmt in ("%I:%M %p", "%H:%M"):
+        try:
+            dt = datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+        delta = datetime(2020, 1, 1, dt.hour, dt.minute) - datetime(2020, 1, 1, 8, 0)
+        return max(delta, timedelta(0))
+    raise ValueError(f"Invalid time '{text}'; use HH:MM AM/PM or 24-hour HH:MM.")